@@ -3,8 +3,12 @@ import logging
 import os
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
-from modules.query_engine import query_ncert
-from modules.question_recommend import recommend_questions
+from modules.answer_validation import validate_answers
+from modules.encoders import configure_encoder
+from modules.metrics import prometheus_text, snapshot
+from modules.response_cache import get_response_cache
+from modules.retrieval_engine import configure_engine
+from modules.submit_pipeline import submit_query
 
 # Page configuration with favicon
 st.set_page_config(
@@ -23,6 +27,20 @@ if not openai_api_key:
 gpt4 = ChatOpenAI(model_name="gpt-4", openai_api_key=openai_api_key)
 logging.basicConfig(filename="logs/app.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Pick the CPU encoder backend ("torch", "onnx" or "onnx-int8"); it must be compatible with the one the indexes were built with
+configure_encoder(backend=os.getenv("ENCODER_BACKEND", "torch"))
+
+# Share one model and index copy across app workers when a retrieval server (serve_retrieval.py) is running;
+# otherwise keep query embeddings warm across Streamlit restarts
+retrieval_server_url = os.getenv("RETRIEVAL_SERVER_URL")
+if retrieval_server_url:
+    configure_engine(server_url=retrieval_server_url)
+else:
+    configure_engine(embedding_cache_path="cache/query_embeddings.pkl")
+
+# Reuse answers and feedback for repeated or near-identical questions across sessions and workers
+response_cache = get_response_cache("cache/responses.sqlite3")
+
 # Initialize session state
 if 'user_answers' not in st.session_state:
     st.session_state.user_answers = {}
@@ -39,28 +57,41 @@ with col2:
     st.title("BioBrain")
     st.subheader("Your biology mentor for Neet Exam")
 
+# Optional per-stage latency and cache counters for this server process
+if st.sidebar.checkbox("Show performance metrics", key="show_metrics"):
+    metrics = snapshot()
+    st.sidebar.markdown("**Stage latencies**")
+    st.sidebar.dataframe([
+        {"stage": span["name"], "labels": ", ".join(f"{k}={v}" for k, v in span["labels"].items()),
+         "count": span["count"], "p50 ms": span["p50_ms"], "p95 ms": span["p95_ms"], "p99 ms": span["p99_ms"]}
+        for span in metrics["spans"]
+    ])
+    st.sidebar.markdown("**Counters**")
+    st.sidebar.dataframe([
+        {"counter": counter["name"], "labels": ", ".join(f"{k}={v}" for k, v in counter["labels"].items()), "value": counter["value"]}
+        for counter in metrics["counters"]
+    ])
+    st.sidebar.download_button("Download Prometheus metrics", prometheus_text(), file_name="metrics.prom", mime="text/plain")
+
 
 # Query Section
 user_query = st.text_input("🔍 Enter your question:", key="query_input")
 
 # Add submit button
+answer_streamed = False
 if st.button("Submit Question", key="submit_query"):
     if user_query:
-        with st.spinner("🔎 Generating Answer..."):
-            retrieved_context = query_ncert(user_query, top_k=5)
-            combined_context = "\n".join(retrieved_context)
-            
-            gpt_prompt = [
-                {"role": "system", "content": "You are an expert in NEET exam biology questions. Provide precise answers."},
-                {"role": "user", "content": f"Context:\n{combined_context}\n\nQuestion:\n{user_query}\n\nAnswer:"}
-            ]
-            gpt_response = gpt4.invoke(gpt_prompt)
-            st.session_state.generated_answer = gpt_response.content if hasattr(gpt_response, "content") else "⚠ Error: No response generated."
-            
-            st.session_state.recommended_questions = recommend_questions(user_query, top_k=5)
+        with st.spinner("🔎 Retrieving context..."):
+            answer_stream = submit_query(gpt4, user_query, top_k=5, recommend_top_k=5, cache=response_cache)
+
+        # Stream the answer while practice questions are recommended in the background
+        st.subheader("📝 BioBrain's Response:")
+        st.session_state.generated_answer = st.write_stream(answer_stream)
+        st.session_state.recommended_questions = answer_stream.recommendations()
+        answer_streamed = True
 
 # Display the generated answer
-if st.session_state.generated_answer:
+if st.session_state.generated_answer and not answer_streamed:
     st.subheader("📝 BioBrain's Response:")
     with st.container():
         st.write(st.session_state.generated_answer)
@@ -117,17 +148,14 @@ if st.session_state.recommended_questions:
                     </div>
                     """, unsafe_allow_html=True)
                 
-                for question, answer in st.session_state.user_answers.items():
-                    validation_context = query_ncert(question, top_k=3)
-                    combined_validation_context = "\n".join(validation_context)
-                    
-                    validation_prompt = [
-                        {"role": "system", "content": "You are an expert in Biology subject of National eligibility cum entrance test (NEET) exam held in India for admission into undergraduate Medical courses. Verify if the given answer is correct based on the retrieved context."},
-                        {"role": "user", "content": f"Context:\n{combined_validation_context}\n\nQuestion:\n{question}\n\nSelected Answer:\n{answer}\n\nIs this answer correct? Provide a brief explanation."}
-                    ]
-                    validation_response = gpt4.invoke(validation_prompt)
-                    
-                    with st.expander(f"Question {list(st.session_state.user_answers.keys()).index(question) + 1} Feedback"):
-                        st.markdown(f"**Your Answer:** {answer}")
-                        st.markdown("**Feedback:**")
-                        st.write(validation_response.content if hasattr(validation_response, 'content') else '⚠ Error validating answer.')
\ No newline at end of file
+                # Placeholders keep feedback in question order while results arrive out of order
+                placeholders = [st.empty() for _ in st.session_state.user_answers]
+                for placeholder in placeholders:
+                    placeholder.info("⏳ Checking your answer...")
+
+                for position, question, answer, feedback in validate_answers(gpt4, st.session_state.user_answers, top_k=3, cache=response_cache):
+                    with placeholders[position].container():
+                        with st.expander(f"Question {position + 1} Feedback"):
+                            st.markdown(f"**Your Answer:** {answer}")
+                            st.markdown("**Feedback:**")
+                            st.write(feedback)
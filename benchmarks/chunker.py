@@ -0,0 +1,58 @@
+import argparse
+import json
+import logging
+import time
+from modules.document_loader import load_pdfs
+from modules.text_processing import TextProcessor
+
+# Setup logging
+logging.basicConfig(filename="logs/benchmarks.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PDF_FOLDERS = ["dataset/data", "rest_data"]
+
+
+def run(text_processor, pages, repeat):
+    """
+    Returns (chunks, best seconds over `repeat` runs) for splitting every page.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = text_processor.split_documents(pages)
+        best = min(best, time.perf_counter() - start)
+    return chunks, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare chunks/s of the legacy TokenTextSplitter path and the fast chunker.")
+    parser.add_argument("--pdfs", nargs="+", default=PDF_FOLDERS, help="PDF folders or files to chunk")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    pages = load_pdfs(args.pdfs, loader_type="pypdf", parallel=True)
+    results = {"pages": len(pages)}
+    outputs = {}
+    for name, fast in (("legacy", False), ("fast", True)):
+        text_processor = TextProcessor(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, fast=fast)
+        chunks, seconds = run(text_processor, pages, args.repeat)
+        outputs[name] = [(doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content) for doc in chunks]
+        results[name] = {"chunks": len(chunks), "seconds": round(seconds, 4), "chunks_per_s": round(len(chunks) / max(seconds, 1e-9), 1)}
+        print(f"{name:<7} {len(chunks)} chunks in {seconds:.3f}s ({results[name]['chunks_per_s']:.0f} chunks/s)")
+
+    results["identical"] = outputs["legacy"] == outputs["fast"]
+    results["speedup"] = round(results["legacy"]["seconds"] / max(results["fast"]["seconds"], 1e-9), 2)
+    print(f"identical chunks: {results['identical']} | speedup: {results['speedup']}x")
+
+    logging.info(f"✅ Chunker benchmark: {results}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if not results["identical"]:
+        raise SystemExit("❌ Fast chunker output differs from TokenTextSplitter.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import time
+import numpy as np
+from benchmarks.suite import CSV_PATH, sample_queries
+from modules.encoders import DEFAULT_ENCODER_PARAMS, ENCODER_BACKENDS, MODEL_NAME, get_encoder
+
+# Setup logging
+logging.basicConfig(filename="logs/benchmarks.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Mean cosine similarity to the torch vectors below which a backend is flagged
+MIN_PARITY = 0.99
+
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from modules.encoders import get_encoder
+get_encoder({"backend": sys.argv[1], "model": sys.argv[2], "num_threads": int(sys.argv[3]) or None}).encode(["warm up"])
+print(time.perf_counter() - start)
+"""
+
+
+def startup_seconds(params):
+    """
+    Returns the seconds a fresh process needs to import, load and first run the encoder.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT, params["backend"], params["model"], str(params["num_threads"] or 0)],
+        capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def throughput(encoder, texts, batch_size, repeat):
+    """
+    Returns (embeddings, best texts/s over `repeat` runs).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embeddings = encoder.encode(texts, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+    return np.asarray(embeddings, dtype=np.float32), len(texts) / max(best, 1e-9)
+
+
+def cosine_parity(reference, embeddings):
+    reference = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    return (reference * embeddings).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare startup, texts/s and embedding parity of the encoder backends.")
+    parser.add_argument("--model", default=MODEL_NAME, help="SentenceTransformer hub name or local folder")
+    parser.add_argument("--backends", nargs="+", choices=ENCODER_BACKENDS, default=list(ENCODER_BACKENDS))
+    parser.add_argument("--texts", type=int, default=2000, help="question bank texts to encode")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_ENCODER_PARAMS["batch_size"])
+    parser.add_argument("--num-threads", type=int, help="CPU threads per backend (default: the library's own)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    texts = sample_queries(CSV_PATH, args.texts, seed=0)
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    results = {"model": args.model, "texts": len(texts)}
+    reference = None
+    for backend in backends:
+        params = {"backend": backend, "model": args.model, "num_threads": args.num_threads}
+        result = {"startup_s": round(startup_seconds(params), 3)}
+        embeddings, texts_per_s = throughput(get_encoder(params), texts, args.batch_size, args.repeat)
+        result["texts_per_s"] = round(texts_per_s, 1)
+        if reference is None:
+            reference = embeddings
+        else:
+            parity = cosine_parity(reference, embeddings)
+            result["parity_mean"] = round(float(parity.mean()), 5)
+            result["parity_min"] = round(float(parity.min()), 5)
+            result["speedup"] = round(texts_per_s / results["torch"]["texts_per_s"], 2)
+        results[backend] = result
+        print(f"{backend:<10} " + " | ".join(f"{name}: {value}" for name, value in result.items()))
+
+    logging.info(f"✅ Encoder benchmark: {results}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    low = [backend for backend in backends[1:] if results[backend]["parity_mean"] < MIN_PARITY]
+    if low:
+        raise SystemExit(f"❌ Embeddings of {', '.join(low)} differ from torch (mean cosine < {MIN_PARITY}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.stubs import load_embedder
+from benchmarks.suite import CSV_PATH, sample_queries
+from modules.question_recommend import recommend_questions
+from modules.query_engine import query_ncert
+from modules.encoders import register_encoder
+from modules.retrieval_engine import configure_engine, FAISS_INDEX_PATH, FAISS_QA_INDEX_PATH
+from modules.retrieval_server import MAX_BATCH_SIZE, MAX_WAIT_MS, create_server
+
+# Setup logging
+logging.basicConfig(filename="logs/benchmarks.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def run_load(queries, concurrency, top_k):
+    """
+    Returns queries/s for `concurrency` threads each calling recommend_questions and query_ncert.
+    """
+    def work(query):
+        recommend_questions(query, top_k=top_k)
+        query_ncert(query, top_k=3)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(work, queries))
+    return 2 * len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare in-process retrieval with the micro-batching retrieval server under concurrent load.")
+    parser.add_argument("--embedder", default="stub", help='"stub" (default, offline), "minilm", or "package.module:attribute"')
+    parser.add_argument("--index-path", default=FAISS_INDEX_PATH)
+    parser.add_argument("--qa-index-path", default=FAISS_QA_INDEX_PATH)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    embedder = load_embedder(args.embedder)
+    if embedder is not None:
+        register_encoder(embedder)
+    queries = sample_queries(CSV_PATH, args.queries, seed=0)
+    engine_settings = {"index_path": args.index_path, "qa_index_path": args.qa_index_path, "embedding_cache_size": 0}
+
+    results = {"queries": len(queries), "concurrency": args.concurrency}
+    configure_engine(**engine_settings)
+    run_load(queries[:args.concurrency], args.concurrency, 5)
+    results["in_process_qps"] = round(run_load(queries, args.concurrency, 5), 1)
+
+    server = create_server(port=0, engine=configure_engine(**engine_settings),
+                           max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        configure_engine(server_url=f"http://127.0.0.1:{server.server_address[1]}")
+        run_load(queries[:args.concurrency], args.concurrency, 5)
+        results["server_qps"] = round(run_load(queries, args.concurrency, 5), 1)
+    finally:
+        server.shutdown()
+        server.server_close()
+        configure_engine()
+
+    results["speedup"] = round(results["server_qps"] / results["in_process_qps"], 2)
+    for name, value in results.items():
+        print(f"{name:<16} {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    logging.info(f"✅ Retrieval server benchmark: {results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+import time
+import numpy as np
+from benchmarks.stubs import load_embedder
+from benchmarks.suite import CSV_PATH, sample_queries
+from modules.document_loader import load_pdfs
+from modules.embeddings_store import store_in_faiss, store_in_shards
+from modules.encoders import register_encoder
+from modules.query_engine import query_ncert
+from modules.retrieval_engine import configure_engine
+from modules.sharded_index import ShardManifest
+from modules.text_processing import TextProcessor
+
+# Setup logging
+logging.basicConfig(filename="logs/benchmarks.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PDF_FOLDERS = ["dataset/data", "rest_data"]
+
+# Scopes compared against the single flat index (None)
+SCOPES = {
+    "flat": None,
+    "all_shards": {},
+    "class_11": {"class": 11},
+    "class_12_chapter": {"class": 12, "chapter": [5]},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare query_ncert on the flat index with scoped searches of the sharded index.")
+    parser.add_argument("--embedder", default="stub", help='"stub" (default, offline), "minilm", or "package.module:attribute"')
+    parser.add_argument("--pdfs", nargs="+", default=PDF_FOLDERS)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--index-params", type=json.loads, default=None, help='e.g. \'{"type": "hnsw"}\'')
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    embedder = load_embedder(args.embedder)
+    if embedder is not None:
+        register_encoder(embedder)
+
+    text_processor = TextProcessor(chunk_size=512, chunk_overlap=100)
+    chunks = text_processor.split_documents(load_pdfs(args.pdfs, loader_type="pypdf", parallel=True))
+    queries = sample_queries(CSV_PATH, args.queries, seed=0)
+    work_dir = tempfile.mkdtemp(prefix="benchmarks-")
+    results = {"chunks": len(chunks), "queries": len(queries)}
+    try:
+        index_path, shard_path = f"{work_dir}/faiss_index", f"{work_dir}/faiss_shards"
+        store_in_faiss(chunks, force_rebuild=True, index_path=index_path, index_params=args.index_params,
+                       chunker=text_processor.settings())
+        store_in_shards(chunks, force_rebuild=True, index_path=shard_path, index_params=args.index_params,
+                        chunker=text_processor.settings())
+        manifest = ShardManifest(shard_path)
+        results["shards"] = len(manifest.shards)
+
+        for name, filters in SCOPES.items():
+            configure_engine(index_path=index_path, shard_path=shard_path, embedding_cache_size=0)
+            query_ncert(queries[0], top_k=args.top_k, filters=filters)
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                query_ncert(query, top_k=args.top_k, filters=filters)
+                latencies.append(time.perf_counter() - start)
+            keys = manifest.select(filters) if filters is not None else list(manifest.shards)
+            results[name] = {
+                "shards": len(keys) if filters is not None else 1,
+                "vectors": manifest.vectors(keys),
+                "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+                "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+            }
+            print(f"{name:<18} " + " | ".join(f"{key}: {value}" for key, value in results[name].items()))
+    finally:
+        configure_engine()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logging.info(f"✅ Shard benchmark: {results}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import importlib
+import numpy as np
+import time
+
+EMBEDDING_DIM = 384
+
+
+class StubEmbedder:
+    """
+    Deterministic bag-of-words hashing embedder with MiniLM's output shape.
+
+    Similar texts share words and so get similar (normalized) vectors, which is
+    enough for retrieval benchmarks without downloading the real model.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in str(text).lower().split():
+                vectors[row, int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class StubMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubChatModel:
+    """
+    Chat model stand-in with configurable latency: `ttft` seconds before the
+    first token, then `token_delay` seconds per token. Supports `invoke`,
+    `ainvoke` and `stream` like a LangChain chat model.
+    """
+
+    def __init__(self, ttft=0.2, token_delay=0.01, tokens=50):
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.calls = 0
+
+    def _reply(self, prompt):
+        words = str(prompt[-1]["content"] if isinstance(prompt, list) else prompt).split()
+        return [f"{words[i % len(words)] if words else 'token'} " for i in range(self.tokens)]
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.ttft + self.token_delay * self.tokens)
+        return StubMessage("".join(self._reply(prompt)))
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.ttft + self.token_delay * self.tokens)
+        return StubMessage("".join(self._reply(prompt)))
+
+    def stream(self, prompt):
+        self.calls += 1
+        time.sleep(self.ttft)
+        for token in self._reply(prompt):
+            time.sleep(self.token_delay)
+            yield StubMessage(token)
+
+
+def load_embedder(spec):
+    """
+    Returns the embedder for `spec`: "stub", "minilm" (None: use the configured encoder backend), or "package.module:attribute".
+    """
+    if spec == "stub":
+        return StubEmbedder()
+    if spec == "minilm":
+        return None
+    module_name, _, attribute = spec.partition(":")
+    embedder = getattr(importlib.import_module(module_name), attribute)
+    return embedder() if isinstance(embedder, type) else embedder
@@ -0,0 +1,208 @@
+import argparse
+import json
+import logging
+import numpy as np
+import os
+import platform
+import shutil
+import tempfile
+import time
+import pandas as pd
+from benchmarks.stubs import StubChatModel, load_embedder
+from modules.answer_validation import validate_answers
+from modules.document_loader import load_pdfs
+from modules.embeddings_store import store_in_faiss
+from modules.query_engine import query_ncert
+from modules.question_recommend import recommend_questions
+from modules.question_store import store_questions
+from modules.encoders import register_encoder
+from modules.retrieval_engine import configure_engine
+from modules.submit_pipeline import submit_query
+from modules.text_processing import TextProcessor
+
+# Setup logging
+logging.basicConfig(filename="logs/benchmarks.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PDF_FOLDER = "dataset/data"
+CSV_PATH = "dataset/questions.csv"
+BASELINE_PATH = "benchmarks/baseline.json"
+REGRESSION_TOLERANCE = 0.2   # fraction a metric may get worse than the baseline before it is flagged
+NOISE_FLOOR_MS = 0.5         # latency changes smaller than this are never flagged
+
+
+class Results:
+    """
+    Collects named metrics with their unit and whether lower or higher is better.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better):
+        self.metrics[name] = {"value": round(float(value), 6), "unit": unit, "better": better}
+        print(f"{name:<45} {value:12.4f} {unit}")
+
+    def latencies(self, name, seconds):
+        for percentile in (50, 95, 99):
+            self.add(f"{name}.p{percentile}_ms", np.percentile(seconds, percentile) * 1000, "ms", "lower")
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def sample_queries(csv_path, count, seed):
+    """
+    Samples distinct questions from the question bank to use as user queries.
+    """
+    questions = pd.read_csv(csv_path)["Question"].dropna().drop_duplicates()
+    return questions.sample(n=min(count, len(questions)), random_state=seed).tolist()
+
+
+def bench_ingest(results, args, work_dir):
+    pdfs = sorted(os.path.join(args.pdfs, f) for f in os.listdir(args.pdfs) if f.endswith(".pdf"))[:args.max_pdfs]
+    docs, seconds = timed(load_pdfs, pdfs, loader_type="pypdf", parallel=True)
+    results.add("ingest.load_pdfs.pages_per_s", len(docs) / seconds, "pages/s", "higher")
+
+    text_processor = TextProcessor(chunk_size=512, chunk_overlap=100)
+    chunks, seconds = timed(text_processor.split_documents, docs)
+    results.add("ingest.chunking.chunks_per_s", len(chunks) / seconds, "chunks/s", "higher")
+
+    index_path = os.path.join(work_dir, "faiss_index")
+    _, seconds = timed(store_in_faiss, chunks, force_rebuild=True, index_path=index_path, index_params=args.index_params,
+                       chunker=text_processor.settings())
+    results.add("ingest.store_in_faiss.chunks_per_s", len(chunks) / seconds, "chunks/s", "higher")
+    _, seconds = timed(store_in_faiss, chunks, index_path=index_path, index_params=args.index_params,
+                       chunker=text_processor.settings())
+    results.add("ingest.store_in_faiss.unchanged_s", seconds, "s", "lower")
+
+    questions = len(pd.read_csv(args.csv))
+    qa_index_path = os.path.join(work_dir, "faiss_qa")
+    _, seconds = timed(store_questions, args.csv, force_rebuild=True, index_path=qa_index_path, index_params=args.index_params)
+    results.add("ingest.store_questions.rows_per_s", questions / seconds, "rows/s", "higher")
+    _, seconds = timed(store_questions, args.csv, index_path=qa_index_path, index_params=args.index_params)
+    results.add("ingest.store_questions.unchanged_s", seconds, "s", "lower")
+    return index_path, qa_index_path
+
+
+def bench_retrieval(results, args, index_path, qa_index_path, queries):
+    # A fresh engine per function: its first call loads the index and record store from disk
+    for name, fn, top_k in (("query_ncert", query_ncert, 3), ("recommend_questions", recommend_questions, 5)):
+        configure_engine(index_path=index_path, qa_index_path=qa_index_path, embedding_cache_size=0)
+        _, cold = timed(fn, queries[0], top_k=top_k)
+        results.add(f"retrieval.{name}.cold_ms", cold * 1000, "ms", "lower")
+        warm = [timed(fn, query, top_k=top_k)[1] for query in queries[1:]]
+        results.latencies(f"retrieval.{name}.warm", warm)
+
+
+def bench_end_to_end(results, args, queries):
+    chat_model = StubChatModel(ttft=args.llm_ttft, token_delay=args.llm_token_delay, tokens=args.llm_tokens)
+    ttft, total, recommended = [], [], []
+    for query in queries[:args.e2e_requests]:
+        answer_stream = submit_query(chat_model, query)
+        for _ in answer_stream:
+            pass
+        recommended = answer_stream.recommendations() or recommended
+        ttft.append(answer_stream.timings["ttft_s"])
+        total.append(answer_stream.timings["total_s"])
+    results.latencies("e2e.submit.ttft", ttft)
+    results.latencies("e2e.submit.total", total)
+
+    user_answers = {question: (next((o for o in options if o), "A")) for question, options in recommended}
+    if user_answers:
+        _, seconds = timed(lambda: list(validate_answers(chat_model, user_answers)))
+        results.add("e2e.validate.wall_ms", seconds * 1000, "ms", "lower")
+        results.add("e2e.validate.questions", len(user_answers), "questions", "higher")
+
+
+def compare(metrics, baseline, tolerance):
+    """
+    Returns the metrics that got worse than `baseline` by more than `tolerance`.
+    """
+    regressions = {}
+    for name, metric in metrics.items():
+        reference = baseline.get("metrics", {}).get(name)
+        if not reference or not reference["value"]:
+            continue
+        change = (metric["value"] - reference["value"]) / abs(reference["value"])
+        worse = change > tolerance if metric["better"] == "lower" else change < -tolerance
+        if metric["unit"] == "ms" and abs(metric["value"] - reference["value"]) < NOISE_FLOOR_MS:
+            worse = False
+        if worse:
+            regressions[name] = {"baseline": reference["value"], "value": metric["value"], "change": round(change, 4)}
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for ingest, retrieval and the submit/validate flow.")
+    parser.add_argument("--embedder", default="stub", help='"stub" (default, offline), "minilm", or "package.module:attribute"')
+    parser.add_argument("--pdfs", default=PDF_FOLDER)
+    parser.add_argument("--max-pdfs", type=int, default=None, help="only ingest the first N PDFs")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--index-params", type=json.loads, default=None, help='e.g. \'{"type": "hnsw"}\'')
+    parser.add_argument("--e2e-requests", type=int, default=20)
+    parser.add_argument("--llm-ttft", type=float, default=0.2, help="stub LLM seconds to first token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.01, help="stub LLM seconds per token")
+    parser.add_argument("--llm-tokens", type=int, default=50)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="compare against this results file")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    embedder = load_embedder(args.embedder)
+    if embedder is not None:
+        register_encoder(embedder)
+
+    results = Results()
+    work_dir = tempfile.mkdtemp(prefix="benchmarks-")
+    try:
+        index_path, qa_index_path = bench_ingest(results, args, work_dir)
+        queries = sample_queries(args.csv, args.queries, args.seed)
+        bench_retrieval(results, args, index_path, qa_index_path, queries)
+        bench_end_to_end(results, args, queries)
+    finally:
+        configure_engine()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "embedder": args.embedder,
+            "index_params": args.index_params,
+            "queries": len(queries),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "metrics": results.metrics,
+    }
+
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(results.metrics, baseline, args.tolerance)
+        for name, regression in report["regressions"].items():
+            print(f"❌ {name}: {regression['baseline']} -> {regression['value']} ({regression['change']:+.1%})")
+        if not report["regressions"]:
+            print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Saved baseline to {args.baseline}")
+
+    logging.info(f"✅ Benchmark run: {report}")
+    if report.get("regressions"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
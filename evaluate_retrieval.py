@@ -0,0 +1,59 @@
+import argparse
+import json
+import logging
+from modules.batch_evaluation import EVAL_KS, evaluate_retrieval, load_eval_set, question_bank_eval_set
+from modules.retrieval_engine import CSV_PATH, FAISS_INDEX_PATH, FAISS_QA_INDEX_PATH
+
+# Setup logging
+logging.basicConfig(filename="logs/evaluate_retrieval.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# (index dir, index file, record store, default relevance label)
+INDEXES = {
+    "chunks": (FAISS_INDEX_PATH, "faiss_index.bin", "texts", ("source", "page")),
+    "questions": (FAISS_QA_INDEX_PATH, "qa_index.bin", "questions", "text"),
+}
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a stored FAISS index with precision@k, recall@k, MRR and nDCG, without an LLM.")
+    parser.add_argument("--index", choices=sorted(INDEXES), default="questions")
+    parser.add_argument("--eval-set", help='CSV with "query" and "relevant" columns (labels separated by "|"); '
+                                           "defaults to the question bank for --index questions")
+    parser.add_argument("--label", help='relevance label: "text", a metadata key, or keys joined by "," (e.g. source,page)')
+    parser.add_argument("--ks", type=_int_list, default=list(EVAL_KS))
+    parser.add_argument("--sample", type=int, default=None, help="only evaluate N queries from the question bank")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--per-query", help="write per-query metrics to this CSV")
+    parser.add_argument("--json", help="write the aggregate report to this file")
+    args = parser.parse_args()
+
+    index_dir, index_file, store_name, label = INDEXES[args.index]
+    if args.label:
+        label = tuple(args.label.split(",")) if "," in args.label else args.label
+
+    if args.eval_set:
+        queries, relevant = load_eval_set(args.eval_set)
+    elif args.index == "questions":
+        queries, relevant = question_bank_eval_set(CSV_PATH, sample=args.sample, seed=args.seed)
+    else:
+        parser.error("--eval-set is required for the chunks index")
+
+    per_query, aggregate = evaluate_retrieval(queries, relevant, index_dir, index_file, store_name,
+                                              label=label, top_k=max(args.ks), ks=args.ks)
+    for name, value in aggregate.items():
+        print(f"{name:<28} {value}")
+
+    if args.per_query:
+        per_query.to_csv(args.per_query, index=False)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"index": args.index, **aggregate}, f, indent=2)
+    logging.info(f"✅ Evaluated {args.index} index: {aggregate}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import argparse
+import logging
+from modules.encoders import MODEL_NAME, ONNX_DIR, export_onnx
+
+# Setup logging
+logging.basicConfig(filename="logs/export_encoder.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the sentence encoder to ONNX (float32 and int8) for the onnx / onnx-int8 backends.")
+    parser.add_argument("--model", default=MODEL_NAME, help="SentenceTransformer hub name or local folder")
+    parser.add_argument("--output-dir", default=ONNX_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="skip the int8 copy")
+    args = parser.parse_args()
+
+    output_dir = export_onnx(args.model, args.output_dir, quantize=not args.no_quantize)
+    print(f"✅ Exported {args.model} to {output_dir}")
+    print("   Use it with configure_encoder(backend=\"onnx\") or backend=\"onnx-int8\", or serve_retrieval.py --encoder-backend.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,43 @@
 import logging
-from langchain.schema import Document  # Import Document for proper formatting
+import sys
 from modules.document_loader import load_pdfs
 from modules.text_processing import TextProcessor
-from modules.embeddings_store import store_in_faiss
-from modules.query_engine import query_ncert
+from modules.embeddings_store import store_in_faiss, store_in_shards
+from modules.encoders import configure_encoder
+from modules.ingest_pipeline import stream_ingest
+from modules.query_engine import query_ncert_batch
+from modules.sharded_index import shard_key
 
 # Setup logging
 logging.basicConfig(filename="logs/main.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # Define paths
-PDF_FOLDER = "dataset/data"
+PDF_FOLDERS = ["dataset/data", "rest_data"]
 
-try:
+# Pass --rebuild to re-embed everything instead of only new or changed PDFs
+FORCE_REBUILD = "--rebuild" in sys.argv
+
+# Pass --stream to ingest page by page in fixed-size embedding batches (bounded memory)
+STREAMING = "--stream" in sys.argv
+EMBED_BATCH_SIZE = 256
+
+# Pass --sharded to also build the per-chapter sharded index that query_ncert(..., filters=...) searches;
+# add --shard=kebo101 (repeatable) to update or, with --rebuild, rebuild only those shards
+SHARDED = "--sharded" in sys.argv
+SHARDS = [arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--shard=")] or None
+
+# FAISS index type: {"type": "flat"}, {"type": "ivf", "nlist": 256, "nprobe": 16} or {"type": "hnsw", "M": 32, "efSearch": 64}
+# (use tune_index.py to pick an operating point). Add "metric": "ip" with "codec": "float16" or "sq8" to store
+# normalized vectors in 2-4x less memory (compare with `python tune_index.py --codecs`)
+INDEX_PARAMS = {"type": "flat"}
+
+# Encoder backend: "torch" (SentenceTransformer), "onnx" or "onnx-int8" (ONNX Runtime, see export_encoder.py),
+# optionally with "num_threads". The index remembers it, and queries must use a compatible backend
+ENCODER_PARAMS = {"backend": "torch"}
+
+def ingest_in_memory():
     # Step 1️⃣: Load NCERT PDFs
-    docs = load_pdfs(PDF_FOLDER, loader_type="pypdf")
+    docs = load_pdfs(PDF_FOLDERS, loader_type="pypdf", parallel=True)
     #
     if not docs:
         raise ValueError("No documents were loaded. Check the PDF folder path.")
@@ -22,24 +46,57 @@ try:
     text_processor = TextProcessor(chunk_size=512, chunk_overlap=100)
 #
     ## Step 3️⃣: Process Documents (Clean & Token-Based Chunking)
-    split_texts = [chunk for doc in docs for chunk in text_processor.split_text(doc.page_content)]
-#
-    ## Step 4️⃣: Convert Split Texts into `Document` Objects for FAISS
-    split_docs = [Document(page_content=text) for text in split_texts]
+    ## Step 4️⃣: Convert Split Texts into `Document` Objects for FAISS, keeping the source PDF, page and offsets
+    split_docs = text_processor.split_documents(docs)
 #
-    ## Step 5️⃣: Store in FAISS
-    store_in_faiss(split_docs)
-
-    # Step 6️⃣: Query Retrieval Test
-    test_query = """
-    Which of the following groups is NOT included in the Kingdom Plantae?
-    """
-    results = query_ncert(test_query)
-
-    # Step 7️⃣: Display Retrieved Results
-    print("\n🔎 Search Results for Query:", test_query)
-    for i, text in enumerate(results):
-        print(f"\n🔹 Result {i+1}:\n{text}")
-
-except Exception as e:
-    logging.error(f"❌ Main execution error: {str(e)}", exc_info=True)
+    ## Step 5️⃣: Store in FAISS (only new or changed PDFs are re-embedded)
+    store_in_faiss(split_docs, force_rebuild=FORCE_REBUILD, index_params=INDEX_PARAMS, chunker=text_processor.settings())
+    return split_docs
+
+def ingest_shards(split_docs=None):
+    # Reuse the chunks of the in-memory ingest, otherwise load only the selected shards' PDFs
+    text_processor = TextProcessor(chunk_size=512, chunk_overlap=100)
+    if split_docs is None:
+        docs = load_pdfs(PDF_FOLDERS, loader_type="pypdf", parallel=True)
+        if SHARDS:
+            docs = [doc for doc in docs if shard_key(doc.metadata.get("source", "")) in SHARDS]
+        if not docs:
+            raise ValueError("No documents were loaded for the sharded index. Check the PDF folders and --shard names.")
+        split_docs = text_processor.split_documents(docs)
+
+    store_in_shards(split_docs, force_rebuild=FORCE_REBUILD, index_params=INDEX_PARAMS, shards=SHARDS,
+                    chunker=text_processor.settings())
+
+if __name__ == "__main__":
+    configure_encoder(**ENCODER_PARAMS)
+    try:
+        split_docs = None
+        if STREAMING:
+            summary = stream_ingest(
+                PDF_FOLDERS, loader_type="pypdf",
+                text_processor=TextProcessor(chunk_size=512, chunk_overlap=100),
+                batch_size=EMBED_BATCH_SIZE, force_rebuild=FORCE_REBUILD,
+                index_params=INDEX_PARAMS
+            )
+            print(f"\n📥 Ingested {summary['pages']} pages ({summary['pages_per_s']} pages/s), "
+                  f"{summary['chunks']} chunks ({summary['chunks_per_s']} chunks/s)")
+        elif not SHARDS:
+            split_docs = ingest_in_memory()
+        if SHARDED or SHARDS:
+            ingest_shards(split_docs)
+
+        # Step 6️⃣: Query Retrieval Test
+        test_queries = [
+            "Which of the following groups is NOT included in the Kingdom Plantae?",
+            "What is the role of stomata in transpiration?",
+        ]
+        results = query_ncert_batch(test_queries)
+
+        # Step 7️⃣: Display Retrieved Results
+        for test_query, query_results in zip(test_queries, results):
+            print("\n🔎 Search Results for Query:", test_query)
+            for i, text in enumerate(query_results):
+                print(f"\n🔹 Result {i+1}:\n{text}")
+
+    except Exception as e:
+        logging.error(f"❌ Main execution error: {str(e)}", exc_info=True)
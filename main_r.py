@@ -1,24 +1,33 @@
 import logging
+from modules.encoders import configure_encoder
 from modules.question_store import store_questions
-from modules.question_recommend import recommend_questions
+from modules.question_recommend import recommend_questions_batch
 
 # Setup logging
 logging.basicConfig(filename="logs/main.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 CSV_PATH = "dataset/questions.csv"  # Ensure this is the correct path to your dataset
+INDEX_PARAMS = {"type": "flat"}  # or "ivf" / "hnsw", optionally with "metric": "ip", "codec": "sq8"; see tune_index.py
+ENCODER_PARAMS = {"backend": "torch"}  # or "onnx" / "onnx-int8"; must match the backend the question index was built with
+
+configure_encoder(**ENCODER_PARAMS)
 
 try:
     # Step 1️⃣: Store Question Embeddings
-    #store_questions(CSV_PATH)
+    #store_questions(CSV_PATH, index_params=INDEX_PARAMS)
 
     # Step 2️⃣: Recommend Questions
-    test_query = "Which of the following groups is NOT included in the Kingdom Plantae?"
-    recommendations = recommend_questions(test_query)
+    test_queries = [
+        "Which of the following groups is NOT included in the Kingdom Plantae?",
+        "What is the role of stomata in transpiration?",
+    ]
+    recommendations = recommend_questions_batch(test_queries)
 
     # Step 3️⃣: Display Recommended Questions
-    print("\n🔎 Recommended Questions for Query:", test_query)
-    for i, question in enumerate(recommendations):
-        print(f"\n🔹 Recommended {i+1}: {question}")
+    for test_query, query_recommendations in zip(test_queries, recommendations):
+        print("\n🔎 Recommended Questions for Query:", test_query)
+        for i, question in enumerate(query_recommendations):
+            print(f"\n🔹 Recommended {i+1}: {question}")
 
 except Exception as e:
     logging.error(f"❌ Main execution error: {str(e)}", exc_info=True)
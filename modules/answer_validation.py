@@ -0,0 +1,124 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import as_completed
+from modules.context_assembly import VALIDATION_TOKEN_BUDGET, assemble_context
+from modules.query_engine import query_ncert_chunks_batch
+from modules.log_config import get_logger
+from modules.metrics import increment, observe, span
+
+# Setup logging
+logger = get_logger(__name__, "logs/answer_validation.log")
+
+MAX_CONCURRENCY = 5       # validation prompts in flight at once
+CALL_TIMEOUT = 30.0       # seconds allowed per LLM call
+MAX_RETRIES = 2           # extra attempts after a failed or timed-out call
+BACKOFF_SECONDS = 1.0     # first retry delay, doubled on every retry
+VALIDATION_ERROR = "⚠ Error validating answer."
+
+SYSTEM_PROMPT = "You are an expert in Biology subject of National eligibility cum entrance test (NEET) exam held in India for admission into undergraduate Medical courses. Verify if the given answer is correct based on the retrieved context."
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    """
+    Returns a process-wide event loop running in a daemon thread.
+
+    Streamlit reruns the script in a fresh thread every time, so async LLM
+    clients get one long-lived loop instead of a new one per rerun.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="answer-validation-loop", daemon=True).start()
+        return _loop
+
+
+def build_validation_prompt(question, answer, context):
+    """
+    Returns the chat messages asking the model to check `answer` against the retrieved `context`.
+    """
+    combined_validation_context = "\n".join(context)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{combined_validation_context}\n\nQuestion:\n{question}\n\nSelected Answer:\n{answer}\n\nIs this answer correct? Provide a brief explanation."}
+    ]
+
+
+async def invoke_with_retry(chat_model, prompt, semaphore, timeout=CALL_TIMEOUT, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """
+    Calls `chat_model.ainvoke(prompt)` under `semaphore` with a per-call timeout,
+    retrying with jittered exponential backoff. Returns the response text.
+    """
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                with span("llm_call", kind="validation"):
+                    response = await asyncio.wait_for(chat_model.ainvoke(prompt), timeout)
+            return response.content if hasattr(response, "content") else str(response)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt) * (0.5 + random.random())
+            increment("llm_retries", kind="validation")
+            logger.warning(f"⚠ LLM call failed ({type(e).__name__}: {e}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def validate_answers(chat_model, user_answers, top_k=3, max_concurrency=MAX_CONCURRENCY, timeout=CALL_TIMEOUT,
+                     retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, cache=None, token_budget=VALIDATION_TOKEN_BUDGET):
+    """
+    Validates every (question -> selected answer) in `user_answers` concurrently.
+
+    Context for all questions is retrieved in one batch and packed into
+    `token_budget` prompt tokens per question, then the validation
+    prompts run concurrently (at most `max_concurrency` at a time). Yields
+    (position, question, answer, feedback) as each call finishes, so feedback
+    can be shown as soon as it arrives; a call that still fails after its
+    retries yields VALIDATION_ERROR instead of raising. With a ResponseCache,
+    (question, answer) pairs validated before are yielded first without a call.
+    """
+    questions = list(user_answers)
+    if not questions:
+        return
+    started = time.perf_counter()
+    contexts = [assemble_context(chunks, token_budget, kind="validation")
+                for chunks in query_ncert_chunks_batch(questions, top_k=top_k)]
+
+    pending = []
+    for position, (question, context) in enumerate(zip(questions, contexts)):
+        answer = user_answers[question]
+        feedback = cache.lookup("validation", question, context, qualifier=answer) if cache is not None else None
+        if feedback is None:
+            pending.append((position, question, context))
+        else:
+            yield position, question, answer, feedback
+
+    loop = _background_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    futures = {
+        asyncio.run_coroutine_threadsafe(
+            invoke_with_retry(chat_model, build_validation_prompt(question, user_answers[question], context),
+                              semaphore, timeout, retries, backoff),
+            loop
+        ): (position, question, context)
+        for position, question, context in pending
+    }
+
+    for future in as_completed(futures):
+        position, question, context = futures[future]
+        try:
+            feedback = future.result()
+            if cache is not None:
+                cache.store("validation", question, context, feedback, qualifier=user_answers[question])
+        except Exception as e:
+            logger.error(f"❌ Error validating answer for '{question}': {str(e)}", exc_info=True)
+            feedback = VALIDATION_ERROR
+        yield position, question, user_answers[question], feedback
+
+    observe("request", time.perf_counter() - started, kind="validate")
+    logger.info(f"✅ Validated {len(questions)} answers ({len(questions) - len(pending)} cached) with up to {max_concurrency} concurrent calls")
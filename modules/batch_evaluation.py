@@ -0,0 +1,186 @@
+import numpy as np
+import os
+import time
+import pandas as pd
+from modules.embedding_cache import normalize_query
+from modules.index_factory import load_index_params, prepare_vectors, read_index
+from modules.record_store import open_record_store
+from modules.encoders import check_index_encoder, default_encoder_params, get_encoder
+from modules.incremental_index import MANIFEST_FILE, IngestManifest
+from modules.log_config import get_logger
+
+# Setup logging
+logger = get_logger(__name__, "logs/batch_evaluation.log")
+
+EVAL_KS = (1, 3, 5, 10)
+ENCODE_BATCH_SIZE = 256
+
+# Separates several relevant labels in one cell of an evaluation set CSV
+LABEL_SEPARATOR = "|"
+
+
+def record_label(text, metadata, label):
+    """
+    Returns the relevance label of a stored record.
+
+    `label` is "text" (the normalized record text, so duplicates count as the
+    same item), a metadata key such as "row", or a tuple of keys such as
+    ("source", "page") whose values are joined with ":".
+    """
+    if label == "text":
+        return normalize_query(text)
+    keys = (label,) if isinstance(label, str) else label
+    return ":".join(str(metadata.get(key, "")) for key in keys)
+
+
+def relevance_matrix(retrieved, relevant):
+    """
+    Returns a boolean (queries, k) matrix marking which retrieved items are relevant.
+
+    `retrieved` is (queries, k) and `relevant` is (queries, m) label ids, both padded with -1.
+    """
+    relevant = np.where(relevant >= 0, relevant, -2)
+    return (retrieved[:, :, None] == relevant[:, None, :]).any(axis=2)
+
+
+def ranking_metrics(hits, num_relevant, ks=EVAL_KS):
+    """
+    Computes precision@k, recall@k and nDCG@k for every k in `ks`, plus MRR over all ranks.
+
+    `hits` is the (queries, k) relevance matrix and `num_relevant` the number of
+    relevant stored records per query. Recall and nDCG are NaN for queries with
+    no relevant records. Returns a dict of per-query arrays.
+    """
+    hits = hits.astype(np.float64)
+    num_relevant = np.asarray(num_relevant, dtype=np.float64)
+    has_relevant = num_relevant > 0
+    discounts = 1.0 / np.log2(np.arange(2, hits.shape[1] + 2))
+    cumulative_hits = np.cumsum(hits, axis=1)
+    cumulative_gain = np.cumsum(hits * discounts, axis=1)
+    ideal_gain = np.concatenate([[0.0], np.cumsum(discounts)])
+
+    metrics = {}
+    for k in ks:
+        k = min(k, hits.shape[1])
+        found = cumulative_hits[:, k - 1]
+        metrics[f"precision@{k}"] = found / k
+        metrics[f"recall@{k}"] = np.divide(found, num_relevant, out=np.full(len(found), np.nan), where=has_relevant)
+        ideal = ideal_gain[np.minimum(num_relevant, k).astype(np.int64)]
+        metrics[f"ndcg@{k}"] = np.divide(cumulative_gain[:, k - 1], ideal, out=np.full(len(found), np.nan), where=has_relevant)
+
+    first_hit = np.argmax(hits > 0, axis=1)
+    metrics["mrr"] = np.where(hits.any(axis=1), 1.0 / (first_hit + 1), 0.0)
+    return metrics
+
+
+def load_eval_set(csv_path):
+    """
+    Reads an evaluation set CSV with `query` and `relevant` columns, where
+    `relevant` holds one or more labels separated by "|".
+    """
+    df = pd.read_csv(csv_path).dropna(subset=["query", "relevant"])
+    relevant = [[label.strip() for label in str(cell).split(LABEL_SEPARATOR) if label.strip()] for cell in df["relevant"]]
+    return df["query"].astype(str).tolist(), relevant
+
+
+def question_bank_eval_set(csv_path, sample=None, seed=0):
+    """
+    Uses the question bank as its own evaluation set: every question is a query
+    whose relevant items are the stored copies of that question (label "text").
+
+    An exact index scores 1.0, so this measures what approximate index types,
+    quantized codecs or a different encoder lose.
+    """
+    questions = pd.read_csv(csv_path)["Question"].dropna().astype(str)
+    questions = questions[questions.str.strip() != ""].drop_duplicates()
+    if sample:
+        questions = questions.sample(n=min(sample, len(questions)), random_state=seed)
+    queries = questions.tolist()
+    return queries, [[normalize_query(query)] for query in queries]
+
+
+def _label_ids(stored, label):
+    """
+    Returns (labels_by_id, vocabulary, counts): the label id of every record id
+    (-1 for deleted ids), the label → id mapping and the number of records per label.
+    """
+    ids = stored.ids()
+    labels_by_id = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int64)
+    vocabulary = {}
+    for record_id, text, metadata in stored.items():
+        labels_by_id[record_id] = vocabulary.setdefault(record_label(text, metadata, label), len(vocabulary))
+    counts = np.bincount(labels_by_id[ids], minlength=len(vocabulary))
+    return labels_by_id, vocabulary, counts
+
+
+def evaluate_retrieval(queries, relevant, index_dir, index_file, store_name, label="text", top_k=10,
+                       ks=EVAL_KS, encode_fn=None, batch_size=ENCODE_BATCH_SIZE):
+    """
+    Scores a stored index on many labelled queries in one pass.
+
+    All queries are embedded in one batched encode and searched with a single
+    FAISS call; precision@k, recall@k, nDCG@k and MRR are then computed with
+    matrix operations instead of per-query LLM or embedding evaluators.
+    `relevant` holds the relevant labels of each query (see `record_label`).
+
+    Returns (per_query DataFrame, aggregate dict).
+    """
+    if len(queries) != len(relevant):
+        raise ValueError("queries and relevant must have the same length.")
+    top_k = max(top_k, *ks)
+    timings = {}
+
+    start = time.perf_counter()
+    faiss_index = read_index(os.path.join(index_dir, index_file))
+    index_params = load_index_params(index_dir)
+    store_path = os.path.join(index_dir, store_name)
+    with open_record_store(store_path, f"{store_path}.pkl") as stored:
+        labels_by_id, vocabulary, counts = _label_ids(stored, label)
+    timings["load_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if encode_fn is None:
+        check_index_encoder(IngestManifest(os.path.join(index_dir, MANIFEST_FILE)).settings, default_encoder_params(), index_dir)
+        encoder = get_encoder()
+        encode_fn = lambda texts: encoder.encode(texts, batch_size=batch_size)
+    query_vectors = prepare_vectors(np.asarray(encode_fn(list(queries)), dtype=np.float32), index_params)
+    timings["encode_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, indices = faiss_index.search(query_vectors, top_k)
+    timings["search_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    valid = (indices >= 0) & (indices < len(labels_by_id))
+    retrieved = np.where(valid, labels_by_id[np.where(valid, indices, 0)], -1)
+
+    width = max((len(labels) for labels in relevant), default=0) or 1
+    relevant_ids = np.full((len(relevant), width), -1, dtype=np.int64)
+    for row, labels in enumerate(relevant):
+        label_ids = sorted({vocabulary.get(str(value), -1) for value in labels} - {-1})
+        relevant_ids[row, :len(label_ids)] = label_ids
+    # Padding (-1) indexes the trailing zero
+    num_relevant = np.append(counts, 0)[relevant_ids].sum(axis=1)
+
+    metrics = ranking_metrics(relevance_matrix(retrieved, relevant_ids), num_relevant, ks)
+    timings["metrics_s"] = time.perf_counter() - start
+
+    per_query = pd.DataFrame({"query": list(queries), "num_relevant": num_relevant, **metrics})
+    per_query["retrieved_ids"] = [row[row >= 0].tolist() for row in indices]
+
+    unlabelled = int((num_relevant == 0).sum())
+    aggregate = {
+        "queries": len(queries),
+        "queries_without_relevant": unlabelled,
+        "top_k": top_k,
+        "label": label if isinstance(label, str) else list(label),
+        "index_params": index_params,
+        **{name: round(float(np.nanmean(values)), 4) if len(values) and not np.isnan(values).all() else 0.0
+           for name, values in metrics.items()},
+        **{name: round(seconds, 4) for name, seconds in timings.items()},
+        "queries_per_s": round(len(queries) / max(sum(timings.values()) - timings["load_s"], 1e-9), 1),
+    }
+    if unlabelled:
+        logger.warning(f"⚠ {unlabelled} of {len(queries)} queries have no relevant records in {store_path}.")
+    logger.info(f"✅ Evaluated {len(queries)} queries against {index_dir}: {aggregate}")
+    return per_query, aggregate
@@ -0,0 +1,115 @@
+import tiktoken
+from functools import lru_cache
+from modules.embedding_cache import normalize_query
+from modules.log_config import get_logger
+from modules.metrics import increment
+
+# Setup logging
+logger = get_logger(__name__, "logs/context_assembly.log")
+
+# Same tokenizer TextProcessor chunks with
+CONTEXT_ENCODING = "gpt2"
+
+# Prompt tokens allowed for retrieved context (5 raw chunks are up to 2560)
+ANSWER_TOKEN_BUDGET = 1536
+VALIDATION_TOKEN_BUDGET = 1024
+
+# A chunk that does not fit is only cut down if at least this many tokens are left
+MIN_PARTIAL_TOKENS = 64
+
+
+@lru_cache(maxsize=None)
+def _encoding(encoding_name):
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text, encoding=CONTEXT_ENCODING):
+    return len(_encoding(encoding).encode(text, disallowed_special=()))
+
+
+def _novel_ranges(start, end, covered):
+    """
+    Returns the parts of [start, end) not already in the sorted, disjoint `covered` ranges.
+    """
+    ranges = []
+    position = start
+    for covered_start, covered_end in covered:
+        if covered_end <= position or covered_start >= end:
+            continue
+        if covered_start > position:
+            ranges.append((position, covered_start))
+        position = max(position, covered_end)
+    if position < end:
+        ranges.append((position, end))
+    return ranges
+
+
+def assemble_context(chunks, token_budget=ANSWER_TOKEN_BUDGET, encoding=CONTEXT_ENCODING, kind="answer"):
+    """
+    Turns retrieved (text, metadata, score) chunks into prompt passages that fit `token_budget`.
+
+    Chunks are taken best score first. Text already selected from the same
+    source page (the 100-token chunk overlap, or the same chunk retrieved
+    twice) is not counted or repeated, and exact duplicate chunks from other
+    sources are dropped. Once the budget is reached, a chunk is cut down to
+    the tokens left, or skipped if fewer than MIN_PARTIAL_TOKENS remain.
+    Selected pieces that touch on the same page are merged back into one
+    passage. Passages are returned best score first.
+
+    Chunks without start_index/end_index (indexes built before offsets were
+    stored) are only de-duplicated.
+    """
+    tokenizer = _encoding(encoding)
+    segments = {}        # (source, page) -> [(start, end, text, rank)]
+    covered = {}         # (source, page) -> sorted disjoint (start, end) ranges
+    seen_texts = set()
+    used = 0
+    retrieved = 0
+
+    ranked = sorted(enumerate(chunks), key=lambda item: (-item[1][2], item[0]))
+    for rank, (_, (text, metadata, _)) in enumerate(ranked):
+        retrieved += count_tokens(text, encoding)
+        normalized = normalize_query(text)
+        if not normalized or normalized in seen_texts:
+            continue
+        seen_texts.add(normalized)
+
+        start, end = metadata.get("start_index"), metadata.get("end_index")
+        if isinstance(start, int) and isinstance(end, int) and end - start == len(text):
+            key = (metadata.get("source"), metadata.get("page"))
+        else:
+            key, start, end = ("unlocated", rank), 0, len(text)
+
+        for piece_start, piece_end in _novel_ranges(start, end, covered.get(key, [])):
+            remaining = token_budget - used
+            piece = text[piece_start - start:piece_end - start]
+            tokens = tokenizer.encode(piece, disallowed_special=())
+            if len(tokens) > remaining:
+                if remaining < MIN_PARTIAL_TOKENS:
+                    continue
+                piece = tokenizer.decode(tokens[:remaining])
+                tokens = tokens[:remaining]
+                if not text[piece_start - start:].startswith(piece):
+                    continue
+                piece_end = piece_start + len(piece)
+            used += len(tokens)
+            segments.setdefault(key, []).append((piece_start, piece_end, piece, rank))
+            covered[key] = sorted(covered.get(key, []) + [(piece_start, piece_end)])
+
+    passages = []
+    for key, pieces in segments.items():
+        pieces.sort()
+        _, merged_end, merged_text, best_rank = pieces[0]
+        for piece_start, piece_end, piece, rank in pieces[1:]:
+            if piece_start == merged_end:
+                merged_end, merged_text, best_rank = piece_end, merged_text + piece, min(best_rank, rank)
+                continue
+            passages.append((best_rank, merged_text))
+            merged_end, merged_text, best_rank = piece_end, piece, rank
+        passages.append((best_rank, merged_text))
+
+    context = [text for _, text in sorted(passages, key=lambda passage: passage[0])]
+    increment("context_tokens", retrieved, kind=kind, stage="retrieved")
+    increment("context_tokens", used, kind=kind, stage="packed")
+    logger.info(f"✅ Assembled {len(chunks)} chunks into {len(context)} passages: {retrieved} -> {used} tokens (budget {token_budget})")
+    return context
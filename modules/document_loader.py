@@ -1,9 +1,11 @@
 import os
-import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
 from langchain_community.document_loaders import PyPDFLoader, UnstructuredPDFLoader, PDFMinerLoader, PyMuPDFLoader
+from modules.log_config import get_logger
 
 # Setup logging
-logging.basicConfig(filename="logs/document_loader.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = get_logger(__name__, "logs/document_loader.log")
 
 LOADER_TYPES = {
     "pypdf": PyPDFLoader,
@@ -12,21 +14,64 @@ LOADER_TYPES = {
     "pymupdf": PyMuPDFLoader
 }
 
-def load_pdfs(pdf_folder: str, loader_type: str = "pypdf"):
-    """Loads PDFs from a folder using LangChain document loaders."""
-    all_docs = []
-    LoaderClass = LOADER_TYPES.get(loader_type, PyPDFLoader)
+def list_pdfs(pdf_folder):
+    """Returns the sorted PDF paths in one folder or a list of folders (PDF files in the list are kept as is)."""
+    folders = [pdf_folder] if isinstance(pdf_folder, str) else list(pdf_folder)
+    pdf_paths = []
+    for folder in folders:
+        if os.path.isfile(folder):
+            pdf_paths.append(folder)
+            continue
+        pdf_paths.extend(os.path.join(folder, file) for file in sorted(os.listdir(folder)) if file.endswith(".pdf"))
+    return pdf_paths
 
+def _load_single_pdf(pdf_path, loader_type):
+    """Parses one PDF. Kept at module level so it can run in a worker process."""
+    start = time.perf_counter()
     try:
-        for file in os.listdir(pdf_folder):
-            if file.endswith(".pdf"):
-                pdf_path = os.path.join(pdf_folder, file)
-                logging.info(f"Loading: {pdf_path} using {loader_type}")
-                loader = LoaderClass(pdf_path)
-                docs = loader.load()
-                all_docs.extend(docs)
-        logging.info(f"Successfully loaded {len(all_docs)} documents from {pdf_folder}")
+        LoaderClass = LOADER_TYPES.get(loader_type, PyPDFLoader)
+        docs = LoaderClass(pdf_path).load()
+        return docs, time.perf_counter() - start, None
     except Exception as e:
-        logging.error(f"Error loading PDFs: {str(e)}", exc_info=True)
+        return [], time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+def load_pdfs_with_report(pdf_folder, loader_type: str = "pypdf", parallel: bool = False, max_workers=None):
+    """
+    Loads PDFs from a folder (or list of folders) and returns (documents, report).
 
-    return all_docs
+    Each PDF is parsed independently, so a bad file is recorded in the report
+    instead of aborting the batch. With `parallel=True` files are parsed across
+    a process pool. Documents are always returned in sorted path order.
+    """
+    pdf_paths = list_pdfs(pdf_folder)
+    start = time.perf_counter()
+
+    if parallel and len(pdf_paths) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_load_single_pdf, pdf_paths, [loader_type] * len(pdf_paths)))
+    else:
+        results = [_load_single_pdf(pdf_path, loader_type) for pdf_path in pdf_paths]
+
+    all_docs = []
+    report = []
+    for pdf_path, (docs, seconds, error) in zip(pdf_paths, results):
+        all_docs.extend(docs)
+        report.append({"path": pdf_path, "pages": len(docs), "seconds": round(seconds, 4), "error": error})
+        if error:
+            logger.error(f"❌ Error loading {pdf_path} using {loader_type}: {error}")
+        else:
+            logger.info(f"Loaded: {pdf_path} using {loader_type} ({len(docs)} pages in {seconds:.2f}s)")
+
+    failed = sum(1 for entry in report if entry["error"])
+    logger.info(f"Successfully loaded {len(all_docs)} documents from {len(pdf_paths) - failed}/{len(pdf_paths)} PDFs "
+                 f"in {time.perf_counter() - start:.2f}s")
+    return all_docs, report
+
+def load_pdfs(pdf_folder, loader_type: str = "pypdf", parallel: bool = False, max_workers=None):
+    """Loads PDFs from a folder using LangChain document loaders."""
+    try:
+        all_docs, _ = load_pdfs_with_report(pdf_folder, loader_type, parallel, max_workers)
+        return all_docs
+    except Exception as e:
+        logger.error(f"Error loading PDFs: {str(e)}", exc_info=True)
+        return []
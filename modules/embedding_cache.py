@@ -0,0 +1,150 @@
+import numpy as np
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from modules.log_config import get_logger
+from modules.metrics import increment
+
+# Setup logging
+logger = get_logger(__name__, "logs/embedding_cache.log")
+
+EMBEDDING_CACHE_SIZE = 4096
+
+
+def normalize_query(text, lowercase=True):
+    """
+    Normalizes query text into a cache key.
+
+    Tokenizers split on whitespace, so whitespace differences produce the same
+    embedding; case only stops mattering for uncased models such as MiniLM.
+    """
+    text = " ".join(str(text).split())
+    return text.lower() if lowercase else text
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings keyed on normalized query text.
+
+    Keys are lowercased only with `lowercase`, i.e. for an uncased encoder;
+    otherwise differently cased queries get their own embeddings.
+    """
+
+    def __init__(self, max_size=EMBEDDING_CACHE_SIZE, persist_path=None, namespace="", lowercase=False):
+        self.max_size = max_size
+        self.persist_path = persist_path
+        self.namespace = namespace
+        self.lowercase = lowercase
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if persist_path:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, texts, encode_fn):
+        """
+        Returns a float32 matrix of embeddings for `texts`, calling `encode_fn` once for all misses.
+        """
+        keys = [normalize_query(text, self.lowercase) for text in texts]
+        found = {}
+        missing = {}
+
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing[key] = text
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        increment("cache_lookups", len(keys) - len(missing), cache="embedding", result="hit")
+        increment("cache_lookups", len(missing), cache="embedding", result="miss")
+
+        if missing:
+            vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._entries[key] = vector
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return np.stack([found[key] for key in keys]).astype(np.float32, copy=False)
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the current fill level.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self):
+        """
+        Writes the cache to `persist_path` so it survives process restarts.
+        """
+        if not self.persist_path:
+            return
+        try:
+            with self._lock:
+                keys = list(self._entries.keys())
+                vectors = np.stack(list(self._entries.values())) if keys else np.zeros((0, 0), dtype=np.float32)
+
+            os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"namespace": self.namespace, "lowercase": self.lowercase, "keys": keys, "vectors": vectors}, f)
+            os.replace(tmp_path, self.persist_path)
+
+            logger.info(f"✅ Saved {len(keys)} cached embeddings to {self.persist_path}")
+        except Exception as e:
+            logger.error(f"❌ Error saving embedding cache: {str(e)}", exc_info=True)
+
+    def load(self):
+        """
+        Restores entries written by `save`, ignoring files from a different namespace (model).
+        """
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "rb") as f:
+                data = pickle.load(f)
+
+            if data.get("namespace") != self.namespace:
+                logger.info(f"⚠ Ignoring embedding cache built for {data.get('namespace')}")
+                return
+            # Files from before keys were only lowercased for uncased encoders always lowercased them
+            if data.get("lowercase", True) != self.lowercase:
+                logger.info(f"⚠ Ignoring embedding cache with {'lowercased' if data.get('lowercase', True) else 'cased'} keys")
+                return
+
+            with self._lock:
+                for key, vector in zip(data["keys"][-self.max_size:], data["vectors"][-self.max_size:]):
+                    self._entries[key] = vector
+
+            logger.info(f"✅ Loaded {len(self._entries)} cached embeddings from {self.persist_path}")
+        except Exception as e:
+            logger.error(f"❌ Error loading embedding cache: {str(e)}", exc_info=True)
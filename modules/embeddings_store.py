@@ -1,43 +1,121 @@
-import logging
-import faiss
-import numpy as np
 import os
-import pickle
-from sentence_transformers import SentenceTransformer
+import shutil
+from modules.incremental_index import hash_file, hash_text, source_digest, update_index
+from modules.encoders import encoder_settings, get_encoder
+from modules.sharded_index import SHARDED_INDEX_PATH, ShardManifest, shard_info, shard_key
+from modules.log_config import get_logger
 
 # Setup logging
-logging.basicConfig(filename="logs/embeddings_store.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = get_logger(__name__, "logs/embeddings_store.log")
 
 FAISS_INDEX_PATH = "faiss_index"
 
-def store_in_faiss(docs):
+# Integer chunk metadata kept in the record store next to each chunk's text
+CHUNK_METADATA = ("page", "chunk", "start_index", "end_index")
+
+def _source_records(docs, chunker=None):
+    """
+    Groups chunks by source PDF as (source, digest, records, extra) tuples for update_index.
+
+    Each record keeps the chunk's page/chunk positions and offsets as metadata.
+    With `chunker` (the TextProcessor settings) a PDF's digest is the one
+    stream_ingest uses; otherwise it covers the chunk texts (plus the file bytes
+    when available). Either way re-chunking the same PDF re-embeds it.
+    """
+    grouped = {}
+    for doc in docs:
+        source = doc.metadata.get("source", "unknown")
+        metadata = {key: doc.metadata[key] for key in CHUNK_METADATA if isinstance(doc.metadata.get(key), int)}
+        grouped.setdefault(source, []).append((doc.page_content, {"source": source, **metadata}))
+
+    sources = []
+    for source, records in grouped.items():
+        texts = [text for text, _ in records]
+        if chunker is not None and os.path.isfile(source):
+            digest = source_digest(source, chunker)
+        else:
+            digest = hash_text(hash_file(source), *texts) if os.path.isfile(source) else hash_text(*texts)
+        sources.append((source, digest, records, {}))
+    return sources
+
+def store_in_faiss(docs, force_rebuild=False, index_path=FAISS_INDEX_PATH, index_params=None, chunker=None):
     """
     Stores document embeddings in FAISS.
+
+    `docs` is the full chunked corpus. Chunks are grouped by their `source`
+    metadata and only sources whose PDF or chunks changed since the last run are
+    re-embedded; sources that disappeared are deleted from the index.
+    `index_params` picks the FAISS index type, e.g. {"type": "hnsw", "M": 32}.
+    Pass the splitting TextProcessor's `settings()` as `chunker` so the index
+    stays current for stream_ingest and the other way round.
     """
     try:
-        # Step 1️⃣: Load Embedding Model
-        model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-        
-        # Step 2️⃣: Extract Texts for Embeddings
-        texts = [doc.page_content for doc in docs]  # ✅ Now correctly formatted
+        # Step 1️⃣: Group and Hash Chunks by Source PDF
+        sources = _source_records(docs, chunker)
 
-        # Step 3️⃣: Generate Embeddings
-        embeddings = model.encode(texts).astype(np.float32)
+        # Step 2️⃣: Embed New/Changed Sources and Update the Index
+        encoder = get_encoder()
+        stats = update_index(
+            index_path, "faiss_index.bin", "texts", sources,
+            lambda texts: encoder.encode(texts),
+            settings=encoder_settings(),
+            force_rebuild=force_rebuild,
+            index_params=index_params
+        )
 
-        # Step 4️⃣: Initialize FAISS Index
-        dim = embeddings.shape[1]
-        faiss_index = faiss.IndexFlatL2(dim)
-        faiss_index.add(embeddings)  # ✅ Store embeddings
+        logger.info(f"✅ Successfully stored {len(docs)} document chunks in FAISS: {stats}")
+
+    except Exception as e:
+        logger.error(f"❌ Error storing embeddings in FAISS: {str(e)}", exc_info=True)
+
+def store_in_shards(docs, force_rebuild=False, index_path=SHARDED_INDEX_PATH, index_params=None, shards=None,
+                    chunker=None):
+    """
+    Stores document embeddings in a sharded index: one FAISS index per chapter
+    PDF (see sharded_index), listed with its class and chapter in shards.json
+    so queries can search only the shards they need.
+
+    Every shard is updated incrementally like `store_in_faiss`. With `shards`
+    (a list of shard keys such as ["kebo101"]) only those shards are updated or,
+    with `force_rebuild`, rebuilt; the others are left as they are. Otherwise
+    shards whose PDFs are no longer in `docs` are deleted.
+    """
+    try:
+        # Step 1️⃣: Group Chunks into Shards by Source PDF
+        grouped = {}
+        for source in _source_records(docs, chunker):
+            grouped.setdefault(shard_key(source[0]), []).append(source)
+        selected = set(grouped) if shards is None else set(shards)
 
-        # Step 5️⃣: Save FAISS Index
-        os.makedirs(FAISS_INDEX_PATH, exist_ok=True)
-        faiss.write_index(faiss_index, os.path.join(FAISS_INDEX_PATH, "faiss_index.bin"))
+        # Step 2️⃣: Embed New/Changed Sources Shard by Shard
+        manifest = ShardManifest(index_path)
+        manifest.settings = encoder_settings()
+        encoder = get_encoder()
+        for key in sorted(selected & set(grouped)):
+            sources = grouped[key]
+            stats = update_index(
+                manifest.shard_dir(key), "faiss_index.bin", "texts", sources,
+                lambda texts: encoder.encode(texts),
+                settings=encoder_settings(),
+                force_rebuild=force_rebuild,
+                index_params=index_params
+            )
+            manifest.shards[key] = {
+                **shard_info(key),
+                "sources": [source for source, _, _, _ in sources],
+                "vectors": sum(len(records) for _, _, records, _ in sources),
+            }
+            logger.info(f"✅ Shard {key}: {stats}")
 
-        # Step 6️⃣: Save Text Chunks
-        with open(os.path.join(FAISS_INDEX_PATH, "texts.pkl"), "wb") as f:
-            pickle.dump(texts, f)
+        # Step 3️⃣: Drop Shards Whose PDFs Are Gone and Save the Shard Manifest
+        missing = [key for key in manifest.shards if key not in grouped and (shards is None or key in selected)]
+        for key in missing:
+            manifest.shards.pop(key)
+            shutil.rmtree(manifest.shard_dir(key), ignore_errors=True)
+        manifest.save()
 
-        logging.info(f"✅ Successfully stored {len(texts)} document chunks in FAISS.")
+        logger.info(f"✅ Stored {len(docs)} document chunks in {len(manifest.shards)} shards "
+                    f"({manifest.vectors()} vectors); removed {len(missing)} shards")
 
     except Exception as e:
-        logging.error(f"❌ Error storing embeddings in FAISS: {str(e)}", exc_info=True)
+        logger.error(f"❌ Error storing embeddings in FAISS shards: {str(e)}", exc_info=True)
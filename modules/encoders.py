@@ -0,0 +1,309 @@
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+from modules.log_config import get_logger
+from modules.metrics import span
+
+# Setup logging
+logger = get_logger(__name__, "logs/encoders.log")
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# "torch" runs SentenceTransformer; "onnx" and "onnx-int8" run an exported copy on ONNX Runtime
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_ENCODER_PARAMS = {"backend": "torch", "model": MODEL_NAME, "batch_size": 32, "num_threads": None}
+
+# Models whose tokenizer lowercases its input, so query case never changes their embeddings
+UNCASED_MODELS = {MODEL_NAME}
+
+# Vectors from backends of the same precision agree closely enough to share an index
+BACKEND_PRECISION = {"torch": "float32", "onnx": "float32", "onnx-int8": "int8"}
+
+# Exported ONNX models and tokenizers, one folder per model
+ONNX_DIR = "models/onnx"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model_int8.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+ONNX_CONFIG_FILE = "export.json"
+
+
+def resolve_encoder_params(params=None):
+    """
+    Fills in defaults for an encoder spec such as {"backend": "onnx-int8", "num_threads": 4}.
+    """
+    resolved = {**DEFAULT_ENCODER_PARAMS, **(params or {})}
+    if resolved["backend"] not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{resolved['backend']}'. Use one of {', '.join(ENCODER_BACKENDS)}.")
+    return resolved
+
+
+def encoder_key(params):
+    """
+    Names the vectors an encoder produces, e.g. for embedding cache namespaces.
+
+    The torch backend keeps the bare model name used before other backends existed.
+    """
+    params = resolve_encoder_params(params)
+    return params["model"] if params["backend"] == "torch" else f"{params['model']}@{params['backend']}"
+
+
+def encoder_uncased(params):
+    """
+    Returns True when the encoder ignores letter case, so cache keys may be lowercased.
+    """
+    return resolve_encoder_params(params)["model"] in UNCASED_MODELS
+
+
+def encoder_settings(params=None):
+    """
+    Returns the index settings recording which encoder (the configured default
+    when None) built an index.
+
+    The backend is only included when it is not torch, so indexes built before
+    backends existed are not rebuilt.
+    """
+    params = default_encoder_params() if params is None else resolve_encoder_params(params)
+    settings = {"model": params["model"]}
+    if params["backend"] != "torch":
+        settings["encoder"] = params["backend"]
+    return settings
+
+
+def check_index_encoder(settings, params, index_name):
+    """
+    Raises ValueError when an index built with the encoder recorded in `settings`
+    cannot be searched with the encoder `params`: a different model, or a
+    different precision (float32 vs int8).
+    """
+    params = resolve_encoder_params(params)
+    built_model = settings.get("model")
+    built_backend = settings.get("encoder", "torch")
+    if built_model is None:
+        return
+    if built_model != params["model"] or BACKEND_PRECISION.get(built_backend) != BACKEND_PRECISION[params["backend"]]:
+        raise ValueError(
+            f"The {index_name} index was built with {built_model} ({built_backend}) but queries use "
+            f"{params['model']} ({params['backend']}); rebuild the index or configure the same encoder."
+        )
+
+
+def _model_dir(model, onnx_dir=ONNX_DIR):
+    return os.path.join(onnx_dir, re.sub(r"[^A-Za-z0-9_.-]+", "__", model.strip("/")))
+
+
+class TorchEncoder:
+    """
+    The original SentenceTransformer (PyTorch) encoder.
+    """
+
+    def __init__(self, model=MODEL_NAME, batch_size=32, num_threads=None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = SentenceTransformer(model)
+        self.batch_size = batch_size
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        return self.model.encode(list(texts), batch_size=batch_size or self.batch_size, convert_to_numpy=True).astype(np.float32)
+
+
+def export_onnx(model=MODEL_NAME, onnx_dir=ONNX_DIR, quantize=True):
+    """
+    Exports a SentenceTransformer (hub name or local folder) to ONNX, plus a
+    dynamically int8-quantized copy, its tokenizer and pooling settings.
+
+    Needs torch, sentence-transformers and onnxruntime; the exported encoder
+    then only needs onnxruntime and tokenizers. Returns the output folder.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    output_dir = _model_dir(model, onnx_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    sentence_model = SentenceTransformer(model, device="cpu")
+    pooling = next(module for module in sentence_model if isinstance(module, Pooling))
+    pooling_mode = pooling.get_pooling_mode_str()
+    if pooling_mode not in ("mean", "cls"):
+        raise ValueError(f"Pooling mode '{pooling_mode}' is not supported by the ONNX encoder.")
+
+    class _Transformer(torch.nn.Module):
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.transformer(input_ids=input_ids, attention_mask=attention_mask,
+                                    token_type_ids=token_type_ids).last_hidden_state
+
+    tokenizer = sentence_model.tokenizer
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    torch.onnx.export(
+        _Transformer(sentence_model[0].auto_model).eval(),
+        tuple(sample.get(name, torch.zeros_like(sample["input_ids"])) for name in names),
+        model_path,
+        input_names=names,
+        output_names=["last_hidden_state"],
+        dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in names},
+                      "last_hidden_state": {0: "batch", 1: "sequence"}},
+        opset_version=14,
+    )
+    if quantize:
+        quantize_dynamic(model_path, os.path.join(output_dir, ONNX_INT8_MODEL_FILE), weight_type=QuantType.QInt8)
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, ONNX_TOKENIZER_FILE))
+    config = {
+        "model": model,
+        "max_length": sentence_model.max_seq_length,
+        "pad_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+        "pooling": pooling_mode,
+        "normalize": any(isinstance(module, Normalize) for module in sentence_model),
+        "dim": sentence_model.get_sentence_embedding_dimension(),
+    }
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    logger.info(f"✅ Exported {model} to ONNX in {output_dir} (int8: {quantize})")
+    return output_dir
+
+
+class OnnxEncoder:
+    """
+    Runs an exported SentenceTransformer on ONNX Runtime, without importing torch.
+
+    Reproduces SentenceTransformer's tokenization, pooling and normalization, and
+    sorts each batch by length to minimize padding. With `quantized` the
+    dynamically int8-quantized model is used. The model is exported on first
+    use when `onnx_dir` does not have it yet.
+    """
+
+    def __init__(self, model=MODEL_NAME, batch_size=32, num_threads=None, quantized=False, onnx_dir=ONNX_DIR):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = _model_dir(model, onnx_dir)
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        if not os.path.exists(os.path.join(model_dir, model_file)):
+            logger.warning(f"⚠ No ONNX export of {model} in {model_dir}; exporting it now.")
+            export_onnx(model, onnx_dir, quantize=quantized)
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, ONNX_TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config["max_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_id"], pad_token=self.config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.batch_size = batch_size
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dim"]
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})[0]
+
+        if self.config["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config["normalize"]:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        texts = [str(text) for text in texts]
+        batch_size = batch_size or self.batch_size
+        embeddings = np.zeros((len(texts), self.config["dim"]), dtype=np.float32)
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            embeddings[rows] = self._encode_batch([texts[row] for row in rows])
+        return embeddings
+
+
+def create_encoder(params=None):
+    """
+    Builds the encoder described by `params` (see DEFAULT_ENCODER_PARAMS).
+    """
+    params = resolve_encoder_params(params)
+    settings = {"model": params["model"], "batch_size": params["batch_size"], "num_threads": params["num_threads"]}
+    if params["backend"] == "torch":
+        return TorchEncoder(**settings)
+    return OnnxEncoder(**settings, quantized=params["backend"] == "onnx-int8", onnx_dir=params.get("onnx_dir", ONNX_DIR))
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+_default_params = {}
+
+
+def _cache_key(params):
+    return json.dumps(resolve_encoder_params(params), sort_keys=True)
+
+
+def configure_encoder(**params):
+    """
+    Sets the process-wide default encoder, e.g. configure_encoder(backend="onnx-int8", num_threads=4).
+
+    Ingestion and the retrieval engine both use it, so set it before either runs.
+    """
+    global _default_params
+    resolve_encoder_params(params)
+    with _encoders_lock:
+        _default_params = params
+
+
+def default_encoder_params():
+    return resolve_encoder_params(_default_params)
+
+
+def get_encoder(params=None):
+    """
+    Returns the process-wide encoder for `params` (the configured default when None), loading it on first use.
+    """
+    params = resolve_encoder_params(_default_params if params is None else params)
+    key = _cache_key(params)
+    with _encoders_lock:
+        encoder = _encoders.get(key)
+        if encoder is None:
+            start = time.perf_counter()
+            with span("model_load", model=params["model"], backend=params["backend"]):
+                encoder = create_encoder(params)
+            _encoders[key] = encoder
+            logger.info(f"✅ Loaded {params['backend']} encoder for {params['model']} in {time.perf_counter() - start:.2f}s")
+    return encoder
+
+
+def register_encoder(encoder, params=None):
+    """
+    Installs `encoder` (anything with a SentenceTransformer-style `encode`) for
+    `params` (the configured default when None), e.g. a stub for offline benchmarks.
+    """
+    with _encoders_lock:
+        _encoders[_cache_key(_default_params if params is None else params)] = encoder
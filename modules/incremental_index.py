@@ -0,0 +1,363 @@
+import hashlib
+import json
+import faiss
+import numpy as np
+import os
+import shutil
+from modules.index_factory import (
+    SEARCH_PARAMS, build_params, create_index, load_index_params, needs_training,
+    prepare_vectors, remove_vectors, resolve_index_params, save_index_params, training_size
+)
+from modules.record_store import RecordStoreWriter, META_FILE, open_record_store
+from modules.log_config import get_logger
+from modules.metrics import span
+
+# Setup logging
+logger = get_logger(__name__, "logs/incremental_index.log")
+
+MANIFEST_FILE = "manifest.json"
+
+
+def hash_file(path):
+    """
+    Returns the SHA-256 hex digest of a file's bytes.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(*parts):
+    """
+    Returns the SHA-256 hex digest of the given strings.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def source_digest(path, chunker):
+    """
+    Returns the manifest digest of a PDF split with `chunker` (TextProcessor.settings()).
+
+    The streaming and in-memory ingests both use it, so either can update an index the other built.
+    """
+    return hash_text(hash_file(path), *[f"{name}={value}" for name, value in sorted(chunker.items())])
+
+
+class IngestManifest:
+    """
+    Maps every ingested source (a PDF, a CSV row, ...) to its content hash and FAISS vector ids.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.sources = {}
+        self.next_id = 0
+        self.settings = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.sources = data.get("sources", {})
+            self.next_id = data.get("next_id", 0)
+            self.settings = data.get("settings", {})
+
+    def is_current(self, key, digest):
+        entry = self.sources.get(key)
+        return entry is not None and entry["hash"] == digest
+
+    def ids_for(self, key):
+        entry = self.sources.get(key)
+        return list(entry["ids"]) if entry else []
+
+    def assign(self, key, digest, count, **extra):
+        """
+        Records `count` fresh vector ids for `key` and returns them.
+        """
+        ids = list(range(self.next_id, self.next_id + count))
+        self.next_id += count
+        self.sources[key] = {"hash": digest, "ids": ids, **extra}
+        return ids
+
+    def extend(self, key, count):
+        """
+        Appends `count` fresh vector ids to an existing `key` and returns them.
+        """
+        ids = list(range(self.next_id, self.next_id + count))
+        self.next_id += count
+        self.sources[key]["ids"].extend(ids)
+        return ids
+
+    def remove(self, key):
+        """
+        Forgets `key` and returns the vector ids it owned.
+        """
+        entry = self.sources.pop(key, None)
+        return list(entry["ids"]) if entry else []
+
+    def reset(self, settings=None):
+        self.sources = {}
+        self.next_id = 0
+        self.settings = settings or {}
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self.settings, "next_id": self.next_id, "sources": self.sources}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class IncrementalIndex:
+    """
+    An ID-mapped FAISS index, its record store (text and metadata by vector id)
+    and its manifest, opened together so sources can be replaced, added and removed.
+
+    `index_params` selects the index type (see index_factory). Nothing is written
+    until `save` is called. The index is rebuilt from scratch when
+    `force_rebuild` is set, when `settings` or the index's build parameters
+    differ from the ones recorded in the manifest, or when the existing index
+    predates the manifest. Search parameters (nprobe, efSearch) can change
+    without a rebuild. A legacy `<store_name>.pkl` is migrated on open.
+    """
+
+    def __init__(self, index_dir, index_file, store_name, settings=None, force_rebuild=False, index_params=None):
+        requested = dict(index_params or {})
+        self.index_params = resolve_index_params(requested)
+        self.settings = {**(settings or {}), "index": build_params(self.index_params)}
+        self.index_dir = index_dir
+        self.index_path = os.path.join(index_dir, index_file)
+        self.store_path = os.path.join(index_dir, store_name)
+        self.manifest = IngestManifest(os.path.join(index_dir, MANIFEST_FILE))
+        self.stats = {"unchanged": 0, "added": 0, "updated": 0, "removed": 0}
+        self.changed = False
+
+        self.faiss_index = None
+        self._store = None
+        self._writer = None
+        self._deleted = set()
+        # HNSW graphs are rebuilt to delete vectors, so their deletions wait for save()
+        self._pending_removals = set()
+        self._metadata_updates = {}
+        self._untrained = []
+        legacy_pickle = f"{self.store_path}.pkl"
+        self.rebuild = (
+            force_rebuild
+            or self.manifest.settings != self.settings
+            or not os.path.exists(self.index_path)
+            or not (os.path.exists(os.path.join(self.store_path, META_FILE)) or os.path.exists(legacy_pickle))
+            or not os.path.exists(self.manifest.path)
+        )
+        if not self.rebuild:
+            self.faiss_index = faiss.read_index(self.index_path)
+            self._store = open_record_store(self.store_path, legacy_pickle)
+            # Keep tuned search parameters unless the caller asked for new ones
+            search_keys = SEARCH_PARAMS[self.index_params["type"]]
+            self.index_params = {
+                **load_index_params(index_dir),
+                **{key: value for key, value in requested.items() if key in search_keys}
+            }
+        else:
+            self.manifest.reset(self.settings)
+            self.changed = True
+
+    def is_current(self, key, digest, **extra):
+        """
+        Returns True (and refreshes `extra`) when `key` is already indexed with `digest`.
+        """
+        if not self.manifest.is_current(key, digest):
+            return False
+        self.manifest.sources[key].update(extra)
+        self.stats["unchanged"] += 1
+        return True
+
+    def _delete_ids(self, ids):
+        if not ids:
+            return
+        if self.faiss_index is not None:
+            if self.index_params["type"] == "hnsw":
+                self._pending_removals.update(ids)
+            else:
+                self.faiss_index = remove_vectors(self.faiss_index, ids, self.index_params)
+        if self._untrained:
+            drop = set(ids)
+            self._untrained = [(i, vector) for i, vector in self._untrained if i not in drop]
+        self._deleted.update(ids)
+        if self._writer is not None:
+            for vector_id in ids:
+                self._writer.remove(vector_id)
+        self.changed = True
+
+    def begin_source(self, key, digest, **extra):
+        """
+        Drops any vectors `key` had and registers it with `digest` and no vectors yet.
+        """
+        self.stats["updated" if key in self.manifest.sources else "added"] += 1
+        self._delete_ids(self.manifest.remove(key))
+        self.manifest.assign(key, digest, 0, **extra)
+
+    def add(self, key, texts, embeddings, metadatas=None):
+        """
+        Appends already-encoded chunks to a source registered with `begin_source`.
+
+        `metadatas` optionally gives one dict of extra columns (page, row, ...) per text.
+        """
+        if not texts:
+            return
+        embeddings = prepare_vectors(embeddings, self.index_params)
+        ids = self.manifest.extend(key, len(texts))
+
+        if self._writer is None:
+            self._writer = RecordStoreWriter(self.store_path)
+        for vector_id, text, metadata in zip(ids, texts, metadatas or [{}] * len(texts)):
+            self._writer.add(vector_id, text, **metadata)
+        self.changed = True
+
+        if self.faiss_index is None and needs_training(self.index_params):
+            # Hold vectors back until there are enough to train the coarse quantizer / code ranges
+            self._untrained.extend(zip(ids, embeddings))
+            if len(self._untrained) >= training_size(self.index_params):
+                self._train_untrained()
+            return
+
+        if self.faiss_index is None:
+            self.faiss_index = create_index(embeddings.shape[1], self.index_params)
+        self.faiss_index.add_with_ids(embeddings, np.array(ids, dtype=np.int64))
+
+    def _train_untrained(self):
+        ids = np.array([i for i, _ in self._untrained], dtype=np.int64)
+        vectors = np.vstack([vector for _, vector in self._untrained]).astype(np.float32)
+        self._untrained = []
+        self.faiss_index = create_index(vectors.shape[1], self.index_params, training_vectors=vectors)
+        self.faiss_index.add_with_ids(vectors, ids)
+        logger.info(f"✅ Trained {self.index_params['type']} index on {len(ids)} vectors: {self.index_params}")
+
+    def refresh_metadata(self, key, metadatas):
+        """
+        Updates stored metadata of an unchanged source (e.g. a CSV row that moved) without re-embedding it.
+        """
+        if self._store is None:
+            return
+        for vector_id, metadata in zip(self.manifest.ids_for(key), metadatas):
+            if self._store.metadata(vector_id) != metadata:
+                self._metadata_updates[vector_id] = metadata
+                self.changed = True
+
+    def remove_source(self, key):
+        self._delete_ids(self.manifest.remove(key))
+
+    def prune(self, current_keys):
+        """
+        Removes every source that is not in `current_keys`.
+        """
+        current_keys = set(current_keys)
+        for key in [key for key in self.manifest.sources if key not in current_keys]:
+            self.remove_source(key)
+            self.stats["removed"] += 1
+
+    @property
+    def ntotal(self):
+        indexed = self.faiss_index.ntotal - len(self._pending_removals) if self.faiss_index is not None else 0
+        return indexed + len(self._untrained)
+
+    def _write_store(self):
+        """
+        Writes the new record store: records added in this session plus the surviving old ones.
+        """
+        writer = self._writer or RecordStoreWriter(self.store_path)
+        self._writer = None
+        if self._store is not None:
+            for vector_id, text, metadata in self._store.items():
+                if vector_id not in self._deleted and vector_id not in writer:
+                    writer.add(vector_id, text, **self._metadata_updates.get(vector_id, metadata))
+            self._store.close()
+            self._store = None
+        writer.close()
+
+    def save(self):
+        """
+        Atomically writes the index and record store (when changed) and the manifest.
+        """
+        if self._untrained:
+            self._train_untrained()
+        if self._pending_removals:
+            self.faiss_index = remove_vectors(self.faiss_index, sorted(self._pending_removals), self.index_params)
+            self._pending_removals = set()
+
+        if not self.changed:
+            self.manifest.save()
+            save_index_params(self.index_dir, self.index_params)
+            logger.info(f"✅ {self.index_path} is up to date: {self.stats}")
+            return
+
+        if self.faiss_index is None:
+            # Nothing left (or nothing yet): delete the old index instead of leaving stale vectors behind
+            if self._writer is not None:
+                self._writer.abort()
+                self._writer = None
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            shutil.rmtree(self.store_path, ignore_errors=True)
+            os.makedirs(self.index_dir, exist_ok=True)
+            save_index_params(self.index_dir, self.index_params)
+            self.manifest.save()
+            self.changed = False
+            logger.warning(f"⚠ Nothing to index in {self.index_dir}; removed {self.index_path}.")
+            return
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        _write_atomic(self.index_path, lambda path: faiss.write_index(self.faiss_index, path))
+        self._write_store()
+        save_index_params(self.index_dir, self.index_params)
+        self.manifest.save()
+        self.changed = False
+
+        logger.info(f"✅ Updated {self.index_path}: {self.stats} | {self.ntotal} vectors")
+
+
+def update_index(index_dir, index_file, store_name, sources, encode_fn, settings=None, force_rebuild=False,
+                 index_params=None):
+    """
+    Brings an IncrementalIndex in line with `sources` and saves it.
+
+    `sources` is the full current corpus as a list of (key, digest, records, extra)
+    tuples, where `records` is a list of (text, metadata) pairs. Only sources
+    whose digest changed are embedded (in one `encode_fn` call); sources that
+    are no longer present have their vectors deleted.
+    """
+    index = IncrementalIndex(index_dir, index_file, store_name, settings, force_rebuild, index_params)
+
+    pending = []
+    for key, digest, records, extra in sources:
+        if index.is_current(key, digest, **extra):
+            index.refresh_metadata(key, [metadata for _, metadata in records])
+        else:
+            index.begin_source(key, digest, **extra)
+            pending.append((key, records))
+    index.prune(key for key, _, _, _ in sources)
+
+    new_texts = [text for _, records in pending for text, _ in records]
+    if new_texts:
+        with span("encode", stage="index"):
+            embeddings = np.asarray(encode_fn(new_texts), dtype=np.float32)
+        offset = 0
+        for key, records in pending:
+            texts = [text for text, _ in records]
+            index.add(key, texts, embeddings[offset:offset + len(texts)], [metadata for _, metadata in records])
+            offset += len(texts)
+
+    index.save()
+    return index.stats
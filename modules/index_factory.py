@@ -0,0 +1,198 @@
+import json
+import faiss
+import numpy as np
+import os
+from modules.log_config import get_logger
+
+# Setup logging
+logger = get_logger(__name__, "logs/index_factory.log")
+
+INDEX_PARAMS_FILE = "index_params.json"
+
+# Default build-time and search-time parameters per index type
+DEFAULT_INDEX_PARAMS = {
+    "flat": {},
+    "ivf": {"nlist": 256, "nprobe": 16},
+    "hnsw": {"M": 32, "efConstruction": 80, "efSearch": 64},
+}
+BUILD_PARAMS = {"flat": (), "ivf": ("nlist",), "hnsw": ("M", "efConstruction")}
+SEARCH_PARAMS = {"flat": (), "ivf": ("nprobe",), "hnsw": ("efSearch",)}
+
+# Vector storage options shared by every index type. "ip" L2-normalizes vectors at
+# build and query time and searches by inner product (cosine similarity); the codec
+# stores vectors as float32, float16, or 8-bit scalar-quantized codes ("sq8").
+DEFAULT_STORAGE_PARAMS = {"metric": "l2", "codec": "float32"}
+METRICS = {"l2": faiss.METRIC_L2, "ip": faiss.METRIC_INNER_PRODUCT}
+CODECS = {"float32": None, "float16": faiss.ScalarQuantizer.QT_fp16, "sq8": faiss.ScalarQuantizer.QT_8bit}
+
+# IVF needs roughly this many training points per list for k-means to be meaningful
+IVF_POINTS_PER_LIST = 39
+
+# Training points used to fit the value ranges of 8-bit codes
+SQ_TRAINING_POINTS = 10000
+
+
+def resolve_index_params(params=None):
+    """
+    Fills in defaults for an index spec such as {"type": "ivf", "nlist": 1024}.
+    """
+    params = dict(params or {})
+    index_type = params.pop("type", "flat")
+    if index_type not in DEFAULT_INDEX_PARAMS:
+        raise ValueError(f"Unknown index type '{index_type}'. Use one of {', '.join(DEFAULT_INDEX_PARAMS)}.")
+    resolved = {"type": index_type, **DEFAULT_STORAGE_PARAMS, **DEFAULT_INDEX_PARAMS[index_type], **params}
+    if resolved["metric"] not in METRICS:
+        raise ValueError(f"Unknown metric '{resolved['metric']}'. Use one of {', '.join(METRICS)}.")
+    if resolved["codec"] not in CODECS:
+        raise ValueError(f"Unknown codec '{resolved['codec']}'. Use one of {', '.join(CODECS)}.")
+    return resolved
+
+
+def build_params(params):
+    """
+    Returns the subset of `params` that changes the index structure (and so requires a rebuild).
+
+    Storage options are only included when they differ from the float32/L2 default,
+    so indexes built before they existed are not rebuilt.
+    """
+    storage = {key: params[key] for key, default in DEFAULT_STORAGE_PARAMS.items() if params.get(key, default) != default}
+    return {"type": params["type"], **{key: params[key] for key in BUILD_PARAMS[params["type"]] if key in params}, **storage}
+
+
+def needs_training(params):
+    return params["type"] == "ivf" or params.get("codec") == "sq8"
+
+
+def training_size(params):
+    """
+    Returns how many vectors to collect before training an index that needs it.
+    """
+    return IVF_POINTS_PER_LIST * params["nlist"] if params["type"] == "ivf" else SQ_TRAINING_POINTS
+
+
+def prepare_vectors(vectors, params):
+    """
+    Returns `vectors` as a float32 array ready to add to or search an index built with `params`
+    (a normalized copy for inner-product indexes).
+    """
+    vectors = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    if params.get("metric") == "ip":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def create_index(dim, params, training_vectors=None):
+    """
+    Creates an empty index that accepts `add_with_ids`, training it first when required.
+
+    For IVF, `nlist` is reduced when there are too few training vectors, and the
+    value actually used is written back into `params`.
+    """
+    index_type = params["type"]
+    metric = METRICS[params.get("metric", "l2")]
+    qtype = CODECS[params.get("codec", "float32")]
+
+    if index_type == "flat":
+        flat = faiss.IndexFlat(dim, metric) if qtype is None else faiss.IndexScalarQuantizer(dim, qtype, metric)
+        index = faiss.IndexIDMap2(flat)
+    elif index_type == "hnsw":
+        if qtype is None:
+            hnsw = faiss.IndexHNSWFlat(dim, params["M"], metric)
+        else:
+            hnsw = faiss.IndexHNSWSQ(dim, qtype, params["M"], metric)
+        hnsw.hnsw.efConstruction = params["efConstruction"]
+        index = faiss.IndexIDMap2(hnsw)
+    else:
+        # IVF keeps its own ids, so it is not wrapped in an IndexIDMap2
+        nlist = max(1, min(params["nlist"], len(training_vectors) // IVF_POINTS_PER_LIST))
+        if nlist != params["nlist"]:
+            logger.warning(f"⚠ Reducing nlist from {params['nlist']} to {nlist} for {len(training_vectors)} training vectors.")
+            params["nlist"] = nlist
+        quantizer = faiss.IndexFlat(dim, metric)
+        if qtype is None:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, metric)
+
+    if not index.is_trained:
+        index.train(prepare_vectors(training_vectors, params))
+    return index
+
+
+def apply_search_params(index, params):
+    """
+    Applies search-time parameters (nprobe, efSearch) to a loaded index.
+    """
+    space = faiss.ParameterSpace()
+    for key in SEARCH_PARAMS.get(params.get("type", "flat"), ()):
+        if key in params:
+            space.set_index_parameter(index, key, params[key])
+    return index
+
+
+def remove_vectors(index, ids, params):
+    """
+    Deletes `ids` from `index` and returns the resulting index.
+
+    HNSW graphs cannot delete vectors, so they are rebuilt from the remaining ones;
+    callers should batch all deletions of a run into one call. Returns None when
+    no HNSW vectors remain, as a quantized graph has nothing left to train on.
+    """
+    ids = np.array(ids, dtype=np.int64)
+    if params["type"] != "hnsw":
+        index.remove_ids(ids)
+        return index
+
+    # Reconstruct every stored vector in one call, then keep the rows whose id survives
+    all_ids = faiss.vector_to_array(index.id_map)
+    keep = ~np.isin(all_ids, ids)
+    keep_ids = all_ids[keep]
+    if not len(keep_ids):
+        logger.info(f"✅ Removed all {index.ntotal} vectors from HNSW index.")
+        return None
+    vectors = index.index.reconstruct_n(0, index.ntotal)[keep].astype(np.float32)
+    rebuilt = create_index(index.d, params, training_vectors=vectors)
+    rebuilt.add_with_ids(prepare_vectors(vectors, params), keep_ids)
+    logger.info(f"✅ Rebuilt HNSW index with {len(keep_ids)} vectors after removing {int((~keep).sum())}.")
+    return rebuilt
+
+
+def load_index_params(index_dir):
+    """
+    Reads the parameters saved next to an index; indexes without a file are flat float32 L2.
+    """
+    path = os.path.join(index_dir, INDEX_PARAMS_FILE)
+    if not os.path.exists(path):
+        return resolve_index_params()
+    with open(path, "r", encoding="utf-8") as f:
+        return resolve_index_params(json.load(f))
+
+
+def save_index_params(index_dir, params):
+    path = os.path.join(index_dir, INDEX_PARAMS_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def set_search_params(index_dir, **search_params):
+    """
+    Updates the persisted search-time parameters of an index without rebuilding it.
+    """
+    params = load_index_params(index_dir)
+    allowed = SEARCH_PARAMS[params["type"]]
+    unknown = [key for key in search_params if key not in allowed]
+    if unknown:
+        raise ValueError(f"{', '.join(unknown)} cannot be set on a '{params['type']}' index.")
+    params.update(search_params)
+    save_index_params(index_dir, params)
+    return params
+
+
+def read_index(index_path):
+    """
+    Reads a FAISS index and applies the search parameters saved next to it.
+    """
+    index = faiss.read_index(index_path)
+    return apply_search_params(index, load_index_params(os.path.dirname(index_path)))
@@ -0,0 +1,135 @@
+import time
+from modules.document_loader import LOADER_TYPES, list_pdfs
+from modules.incremental_index import IncrementalIndex, source_digest
+from modules.encoders import encoder_settings, get_encoder
+from modules.text_processing import TextProcessor
+from langchain_community.document_loaders import PyPDFLoader
+from modules.log_config import get_logger
+from modules.metrics import span
+
+# Setup logging
+logger = get_logger(__name__, "logs/ingest_pipeline.log")
+
+FAISS_INDEX_PATH = "faiss_index"
+EMBED_BATCH_SIZE = 256
+PAGE_BATCH_SIZE = 32       # pages split together (one tokenizer batch and one log line per batch)
+
+
+class _Throughput:
+    """
+    Tracks pages and chunks processed and logs throughput as the ingest runs.
+    """
+
+    def __init__(self, log_every=5.0):
+        self.start = time.perf_counter()
+        self.log_every = log_every
+        self._last_log = self.start
+        self.pages = 0
+        self.chunks = 0
+
+    def report(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self._last_log < self.log_every:
+            return
+        self._last_log = now
+        elapsed = max(now - self.start, 1e-9)
+        logger.info(f"⏱ {self.pages} pages ({self.pages / elapsed:.1f} pages/s), "
+                     f"{self.chunks} chunks ({self.chunks / elapsed:.1f} chunks/s) in {elapsed:.1f}s")
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "seconds": round(elapsed, 3),
+            "pages_per_s": round(self.pages / elapsed, 2),
+            "chunks_per_s": round(self.chunks / elapsed, 2),
+        }
+
+
+def stream_ingest(pdf_folder, loader_type="pypdf", text_processor=None, batch_size=EMBED_BATCH_SIZE,
+                  force_rebuild=False, index_path=FAISS_INDEX_PATH, index_params=None, page_batch_size=PAGE_BATCH_SIZE):
+    """
+    Streams PDFs page by page through chunking and embedding into the NCERT index.
+
+    Pages are loaded lazily, split with `text_processor` in batches of
+    `page_batch_size` pages, and the chunks collected into
+    batches of `batch_size` chunks that are encoded and appended to the index as
+    soon as they fill, so the pipeline never holds more than one batch of chunks
+    and embeddings. `batch_size` therefore sets the pipeline's peak memory; only
+    the resident index and text store grow with the corpus.
+
+    PDFs whose file hash and chunker settings match the manifest are skipped
+    without being parsed; changing chunk_size or chunk_overlap re-embeds them.
+    A PDF that fails midway is dropped from the index so the next run retries it.
+
+    Returns a summary with page/chunk counts, throughput and per-file errors.
+    """
+    text_processor = text_processor or TextProcessor()
+    LoaderClass = LOADER_TYPES.get(loader_type, PyPDFLoader)
+    encoder = get_encoder()
+    index = IncrementalIndex(index_path, "faiss_index.bin", "texts",
+                             settings=encoder_settings(), force_rebuild=force_rebuild,
+                             index_params=index_params)
+    progress = _Throughput()
+    pending = []
+    pages = []
+    errors = {}
+
+    def flush():
+        if not pending:
+            return
+        with span("encode", stage="index"):
+            embeddings = encoder.encode([text for _, text, _ in pending])
+        offset = 0
+        while offset < len(pending):
+            key = pending[offset][0]
+            end = offset
+            while end < len(pending) and pending[end][0] == key:
+                end += 1
+            batch = pending[offset:end]
+            index.add(key, [text for _, text, _ in batch], embeddings[offset:end], [metadata for _, _, metadata in batch])
+            offset = end
+        progress.chunks += len(pending)
+        pending.clear()
+        progress.report()
+
+    def split_pages(pdf_path):
+        for doc in text_processor.split_documents(pages):
+            metadata = {key: doc.metadata[key] for key in ("page", "chunk", "start_index", "end_index") if key in doc.metadata}
+            pending.append((pdf_path, doc.page_content, {"source": pdf_path, **metadata}))
+            if len(pending) >= batch_size:
+                flush()
+        pages.clear()
+
+    chunker = text_processor.settings()
+    pdf_paths = list_pdfs(pdf_folder)
+    for pdf_path in pdf_paths:
+        digest = source_digest(pdf_path, chunker)
+        if index.is_current(pdf_path, digest):
+            continue
+
+        index.begin_source(pdf_path, digest)
+        try:
+            for page_number, page in enumerate(LoaderClass(pdf_path).lazy_load()):
+                progress.pages += 1
+                page.metadata["page"] = page.metadata.get("page", page_number)
+                pages.append(page)
+                if len(pages) >= page_batch_size:
+                    split_pages(pdf_path)
+            split_pages(pdf_path)
+        except Exception as e:
+            pages.clear()
+            pending[:] = [item for item in pending if item[0] != pdf_path]
+            index.remove_source(pdf_path)
+            errors[pdf_path] = f"{type(e).__name__}: {e}"
+            logger.error(f"❌ Error ingesting {pdf_path}: {str(e)}", exc_info=True)
+
+    flush()
+    index.prune(pdf_paths)
+    index.save()
+
+    progress.report(force=True)
+    summary = {**progress.summary(), **index.stats, "vectors": index.ntotal, "errors": errors}
+    logger.info(f"✅ Streaming ingest finished: {summary}")
+    return summary
@@ -1,28 +1,44 @@
-import logging
 import faiss
 import os
 import pickle
 import numpy as np
 from langchain.evaluation.qa import QAEvaluator
 from langchain.evaluation.embedding_distance import EmbeddingDistanceEvaluator
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from modules.encoders import get_encoder
+from modules.log_config import get_logger
 
 # Setup logging
-logging.basicConfig(filename="logs/lc_evaluation.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = get_logger(__name__, "logs/lc_evaluation.log")
 
 FAISS_QA_INDEX_PATH = "faiss_qa"
 
+class EncoderEmbeddings(Embeddings):
+    """
+    Exposes the configured encoder (see modules.encoders) as LangChain embeddings.
+    """
+
+    def __init__(self, params=None):
+        self.encoder = get_encoder(params)
+
+    def embed_documents(self, texts):
+        return self.encoder.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
 class LangChainEvaluator:
     def __init__(self):
         """
         Initializes LangChain's evaluation modules.
         """
-        self.embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        self.embedding_model = EncoderEmbeddings()
         self.qa_evaluator = QAEvaluator()
+        # LangChain's default (OpenAI) embeddings, as before, so similarity scores stay comparable across runs
         self.embedding_evaluator = EmbeddingDistanceEvaluator()
 
-        logging.info("✅ Initialized LangChain Evaluators.")
+        logger.info("✅ Initialized LangChain Evaluators.")
 
     def precision_at_k(self, recommended, relevant, k=5):
         """
@@ -32,7 +48,7 @@ class LangChainEvaluator:
         precision_score = self.qa_evaluator.evaluate([{"question": q, "answer": q in relevant} for q in recommended])
 
         precision = precision_score["score"]
-        logging.info(f"✅ Precision @ {k}: {precision:.4f}")
+        logger.info(f"✅ Precision @ {k}: {precision:.4f}")
         return precision
 
     def recall_at_k(self, recommended, relevant, k=5):
@@ -42,7 +58,7 @@ class LangChainEvaluator:
         recommended = recommended[:k]
         recall_score = sum(1 for q in recommended if q in relevant) / len(relevant) if relevant else 0
 
-        logging.info(f"✅ Recall @ {k}: {recall_score:.4f}")
+        logger.info(f"✅ Recall @ {k}: {recall_score:.4f}")
         return recall_score
 
     def embedding_similarity(self, recommended, relevant):
@@ -53,5 +69,5 @@ class LangChainEvaluator:
         similarity_scores = self.embedding_evaluator.evaluate(eval_pairs)
 
         avg_similarity = np.mean([s["score"] for s in similarity_scores]) if similarity_scores else 0
-        logging.info(f"✅ Embedding Similarity: {avg_similarity:.4f}")
+        logger.info(f"✅ Embedding Similarity: {avg_similarity:.4f}")
         return avg_similarity
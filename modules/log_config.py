@@ -0,0 +1,23 @@
+import logging
+import os
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def get_logger(name, log_file, level=logging.INFO):
+    """
+    Returns the logger `name` writing to its own `log_file`.
+
+    logging.basicConfig only takes effect for the first module that calls it,
+    so every module gets a dedicated, non-propagating file handler instead.
+    """
+    logger = logging.getLogger(name)
+    path = os.path.abspath(log_file)
+    if not any(getattr(handler, "baseFilename", None) == path for handler in logger.handlers):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = logging.FileHandler(path, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
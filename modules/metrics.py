@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from modules.log_config import get_logger
+
+# Setup logging
+logger = get_logger(__name__, "logs/metrics.log")
+
+# Structured JSON lines, one per finished span, for log shippers
+span_logger = get_logger(f"{__name__}.spans", "logs/metrics.jsonl")
+span_logger.handlers[0].setFormatter(logging.Formatter("%(message)s"))
+
+METRIC_PREFIX = "biobrain"
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus-style
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Spans shorter than this are aggregated but not written to the JSON log
+JSON_LOG_MIN_SECONDS = 0.001
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram with a running sum and count.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(self.buckets) and seconds > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimates the `q` quantile by linear interpolation inside its bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 6),
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+        }
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and latency histograms keyed by (name, labels).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """
+        Returns every counter and histogram summary as a JSON-serializable dict.
+        """
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "spans": [{"name": name, "labels": dict(labels), **histogram.summary()}
+                          for (name, labels), histogram in sorted(self.histograms.items())],
+            }
+
+    def prometheus_text(self):
+        """
+        Renders all metrics in the Prometheus text exposition format.
+        """
+        def render_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{METRIC_PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter_name, labels), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{metric}{render_labels(labels)} {value}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{METRIC_PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{render_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{metric}_sum{render_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{render_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def increment(name, value=1, **labels):
+    """
+    Adds `value` to the counter `name` (e.g. increment("cache_hits", cache="embedding")).
+    """
+    registry.increment(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    """
+    Records a duration measured elsewhere (e.g. time to first token) in the histogram `name`.
+    """
+    registry.observe(name, seconds, **labels)
+    if seconds >= JSON_LOG_MIN_SECONDS:
+        span_logger.info(json.dumps({"ts": round(time.time(), 3), "span": name, **labels, "ms": round(seconds * 1000, 3)}))
+
+
+@contextmanager
+def span(name, **labels):
+    """
+    Times the enclosed block into the histogram `name` and logs it as a JSON line.
+
+    A block that raises is recorded with error=<exception type> and also counted in `errors`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        labels = {**labels, "error": type(e).__name__}
+        increment("errors", stage=name, error=type(e).__name__)
+        raise
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+def prometheus_text():
+    return registry.prometheus_text()
+
+
+def export_prometheus(path):
+    """
+    Writes the Prometheus text dump to `path` (e.g. for node_exporter's textfile collector).
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+    logger.info(f"✅ Exported metrics to {path}")
@@ -1,48 +1,59 @@
-import logging
-import faiss
-import numpy as np
-import os
-import pickle
-from sentence_transformers import SentenceTransformer
+from modules.retrieval_engine import get_engine
+from modules.log_config import get_logger
 
 # Setup logging
-logging.basicConfig(filename="logs/query_engine.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = get_logger(__name__, "logs/query_engine.log")
 
-FAISS_INDEX_PATH = "faiss_index"
-
-def query_ncert(query_text, top_k=3):
+def query_ncert(query_text, top_k=3, filters=None):
     """
-    Retrieves relevant NCERT content from FAISS using GPT-2 embeddings.
+    Retrieves relevant NCERT content from FAISS using the shared retrieval engine.
+
+    With `filters`, e.g. {"class": 11} or {"class": 12, "chapter": [5, 6]}, only
+    the matching chapter shards of the sharded index are searched ({} searches all shards).
     """
     try:
-        # Step 1️⃣: Load Embedding Model
-        model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        retrieved_texts = get_engine().search_texts(query_text, top_k, filters)
 
-        # Step 2️⃣: Load FAISS Index
-        faiss_index_path = os.path.join(FAISS_INDEX_PATH, "faiss_index.bin")
-        if not os.path.exists(faiss_index_path):
-            logging.error("❌ FAISS index not found.")
-            return []
+        logger.info(f"✅ Query: {query_text} | Retrieved {len(retrieved_texts)} results")
+        return retrieved_texts
 
-        faiss_index = faiss.read_index(faiss_index_path)
+    except FileNotFoundError as e:
+        logger.error(f"❌ FAISS index not found: {str(e)}")
+        return []
+    except Exception as e:
+        logger.error(f"❌ Error querying FAISS: {str(e)}", exc_info=True)
+        return []
 
-        # Step 3️⃣: Load Stored Text Chunks
-        texts_path = os.path.join(FAISS_INDEX_PATH, "texts.pkl")
-        with open(texts_path, "rb") as f:
-            stored_texts = pickle.load(f)
+def query_ncert_batch(queries, top_k=3, filters=None):
+    """
+    Retrieves relevant NCERT content for several queries at once, returning one list per query.
+    """
+    try:
+        results = get_engine().search_texts_batch(queries, top_k, filters)
 
-        # Step 4️⃣: Encode Query Text
-        query_embedding = model.encode([query_text]).astype(np.float32)
+        logger.info(f"✅ Batch query: {len(queries)} queries | Retrieved {sum(len(r) for r in results)} results")
+        return results
 
-        # Step 5️⃣: Search FAISS for Nearest Matches
-        _, indices = faiss_index.search(query_embedding, top_k)
+    except FileNotFoundError as e:
+        logger.error(f"❌ FAISS index not found: {str(e)}")
+        return [[] for _ in queries]
+    except Exception as e:
+        logger.error(f"❌ Error querying FAISS: {str(e)}", exc_info=True)
+        return [[] for _ in queries]
 
-        # Step 6️⃣: Retrieve Relevant Text Chunks
-        retrieved_texts = [stored_texts[i] for i in indices[0] if i < len(stored_texts)]
+def query_ncert_chunks_batch(queries, top_k=3, filters=None):
+    """
+    Retrieves NCERT chunks with their source/page offsets and scores, as (text, metadata, score), for context assembly.
+    """
+    try:
+        results = get_engine().search_chunks_batch(queries, top_k, filters)
 
-        logging.info(f"✅ Query: {query_text} | Retrieved {len(retrieved_texts)} results")
-        return retrieved_texts
+        logger.info(f"✅ Chunk query: {len(queries)} queries | Retrieved {sum(len(r) for r in results)} chunks")
+        return results
 
+    except FileNotFoundError as e:
+        logger.error(f"❌ FAISS index not found: {str(e)}")
+        return [[] for _ in queries]
     except Exception as e:
-        logging.error(f"❌ Error querying FAISS: {str(e)}", exc_info=True)
-        return []
+        logger.error(f"❌ Error querying FAISS: {str(e)}", exc_info=True)
+        return [[] for _ in queries]
@@ -1,48 +1,71 @@
-import logging
-import faiss
-import numpy as np
-import os
 import pandas as pd
-import pickle
-from sentence_transformers import SentenceTransformer
+from modules.incremental_index import hash_text, update_index
+from modules.encoders import encoder_settings, get_encoder
+from modules.retrieval_engine import OPTION_LABELS
+from modules.log_config import get_logger
+from modules.metrics import span
 
 # Setup logging
-logging.basicConfig(filename="logs/question_store.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = get_logger(__name__, "logs/question_store.log")
 
 FAISS_QA_INDEX_PATH = "faiss_qa"
 
-def store_questions(csv_path):
+
+def compile_question(record, row):
+    """
+    Returns the metadata stored with a question: its CSV row, subject and
+    whitespace-normalized options as option_A ... option_I (blank options are left out).
+    """
+    metadata = {"row": row}
+    if record.get("Subject", "").strip():
+        metadata["subject"] = record["Subject"].strip()
+    for label in OPTION_LABELS:
+        option = " ".join(record.get(label, "").split())
+        if option:
+            metadata[f"option_{label}"] = option
+    return metadata
+
+
+def store_questions(csv_path, force_rebuild=False, index_path=FAISS_QA_INDEX_PATH, index_params=None):
     """
     Stores question embeddings from a CSV dataset in FAISS for recommendation.
+
+    Each row is keyed by a hash of its contents, so re-running after adding or
+    editing rows only embeds those rows, and deleted rows are removed. Subject
+    and options are compiled into the record store next to each question, keyed
+    by its vector id, so recommendation never needs to read the CSV.
+    `index_params` picks the FAISS index type, e.g. {"type": "ivf", "nlist": 128}.
     """
     try:
         # Load dataset
-        df = pd.read_csv(csv_path)
+        with span("csv_parse"):
+            df = pd.read_csv(csv_path)
 
         # Ensure 'Question' column exists
         if "Question" not in df.columns:
             raise ValueError("Dataset must have a 'Question' column.")
 
-        model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-        # Extract questions
-        questions = df["Question"].dropna().tolist()
-        embeddings = model.encode(questions).astype(np.float32)
-
-        # Initialize FAISS Index
-        dim = embeddings.shape[1]
-        faiss_index = faiss.IndexFlatL2(dim)
-        faiss_index.add(embeddings)
-
-        # Save FAISS index
-        os.makedirs(FAISS_QA_INDEX_PATH, exist_ok=True)
-        faiss.write_index(faiss_index, os.path.join(FAISS_QA_INDEX_PATH, "qa_index.bin"))
+        # Key every non-empty question by its row contents
+        sources = []
+        seen = {}
+        for row, values in enumerate(df.fillna("").astype(str).itertuples(index=False)):
+            record = dict(zip(df.columns, values))
+            if pd.isna(df["Question"].iat[row]):
+                continue
+            digest = hash_text(*values)
+            seen[digest] = seen.get(digest, 0) + 1
+            sources.append((f"row:{digest}:{seen[digest]}", digest, [(record["Question"], compile_question(record, row))], {"row": row}))
 
-        # Save question text data
-        with open(os.path.join(FAISS_QA_INDEX_PATH, "questions.pkl"), "wb") as f:
-            pickle.dump(questions, f)
+        encoder = get_encoder()
+        stats = update_index(
+            index_path, "qa_index.bin", "questions", sources,
+            lambda questions: encoder.encode(questions),
+            settings=encoder_settings(),
+            force_rebuild=force_rebuild,
+            index_params=index_params
+        )
 
-        logging.info(f"✅ Successfully stored {len(questions)} question embeddings in FAISS.")
+        logger.info(f"✅ Successfully stored {len(sources)} question embeddings in FAISS: {stats}")
 
     except Exception as e:
-        logging.error(f"❌ Error storing questions in FAISS: {str(e)}", exc_info=True)
+        logger.error(f"❌ Error storing questions in FAISS: {str(e)}", exc_info=True)
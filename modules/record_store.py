@@ -0,0 +1,275 @@
+import json
+import mmap
+import numpy as np
+import os
+import pickle
+import shutil
+import tempfile
+from modules.log_config import get_logger
+
+# Setup logging
+logger = get_logger(__name__, "logs/record_store.log")
+
+BLOB_FILE = "blob.bin"
+OFFSETS_FILE = "offsets.npy"
+META_FILE = "meta.json"
+
+# String columns with more distinct values than this are stored as text (blob + offsets)
+# instead of being dictionary-encoded into meta.json
+DICTIONARY_MAX_VALUES = 1024
+
+
+def _column_file(name):
+    return f"col_{name}.npy"
+
+
+def _column_blob_file(name):
+    return f"col_{name}.blob"
+
+
+def _write_texts(blob_path, slots, values):
+    """
+    Writes `values` (a dict of record id -> str) to a blob and returns its (slots, 2) offsets array.
+    """
+    offsets = np.full((slots, 2), -1, dtype=np.int64)
+    position = 0
+    with open(blob_path, "wb") as blob:
+        for record_id, value in values.items():
+            data = str(value).encode("utf-8")
+            blob.write(data)
+            offsets[record_id] = (position, position + len(data))
+            position += len(data)
+    return offsets
+
+
+def _map_blob(blob_path):
+    """
+    Memory-maps a blob file, returning (file, mapping); empty files map to b"".
+    """
+    if not os.path.getsize(blob_path):
+        return None, b""
+    blob_file = open(blob_path, "rb")
+    return blob_file, mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class RecordStoreWriter:
+    """
+    Builds a record store: one UTF-8 blob, an offsets array indexed by record id,
+    and per-record metadata columns.
+
+    Text is appended to the blob on disk as records arrive; only offsets and
+    metadata are kept in memory. Nothing is visible to readers until `close`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # A private temp directory next to the store, so concurrent writers (e.g. two migrations) never share one
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self.tmp_path = tempfile.mkdtemp(prefix=f"{os.path.basename(path)}.new-", dir=parent)
+        self._blob = open(os.path.join(self.tmp_path, BLOB_FILE), "wb")
+        self._position = 0
+        self._offsets = {}
+        self._columns = {}
+
+    def __contains__(self, record_id):
+        return int(record_id) in self._offsets
+
+    def add(self, record_id, text, **metadata):
+        data = text.encode("utf-8")
+        self._blob.write(data)
+        self._offsets[int(record_id)] = (self._position, self._position + len(data))
+        self._position += len(data)
+        for name, value in metadata.items():
+            self._columns.setdefault(name, {})[int(record_id)] = value
+
+    def remove(self, record_id):
+        """
+        Drops a record added earlier in this writer (its bytes stay in the blob until the next rebuild).
+        """
+        self._offsets.pop(int(record_id), None)
+        for values in self._columns.values():
+            values.pop(int(record_id), None)
+
+    def close(self):
+        """
+        Writes offsets and metadata and atomically swaps the new store into place.
+        """
+        self._blob.close()
+        slots = max(self._offsets) + 1 if self._offsets else 0
+
+        offsets = np.full((slots, 2), -1, dtype=np.int64)
+        for record_id, span in self._offsets.items():
+            offsets[record_id] = span
+        np.save(os.path.join(self.tmp_path, OFFSETS_FILE), offsets)
+
+        columns = {}
+        for name, values in self._columns.items():
+            live = {record_id: value for record_id, value in values.items() if record_id in self._offsets}
+            if all(isinstance(value, (int, np.integer)) and not isinstance(value, bool) for value in live.values()):
+                column = np.full(slots, -1, dtype=np.int64)
+                for record_id, value in live.items():
+                    column[record_id] = value
+                columns[name] = {"type": "int"}
+            elif len({str(value) for value in live.values()}) > DICTIONARY_MAX_VALUES:
+                # Mostly-unique strings get their own blob, like the main text
+                column = _write_texts(os.path.join(self.tmp_path, _column_blob_file(name)), slots, live)
+                columns[name] = {"type": "text"}
+            else:
+                # Dictionary-encode strings: int32 codes into a vocabulary kept in meta.json
+                vocabulary = sorted({str(value) for value in live.values()})
+                codes = {value: code for code, value in enumerate(vocabulary)}
+                column = np.full(slots, -1, dtype=np.int32)
+                for record_id, value in live.items():
+                    column[record_id] = codes[str(value)]
+                columns[name] = {"type": "str", "vocabulary": vocabulary}
+            np.save(os.path.join(self.tmp_path, _column_file(name)), column)
+
+        with open(os.path.join(self.tmp_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"count": len(self._offsets), "slots": slots, "columns": columns}, f)
+
+        # Swap directories; readers that still map the old files keep working
+        old_path = f"{self.tmp_path}.old"
+        while True:
+            shutil.rmtree(old_path, ignore_errors=True)
+            try:
+                os.replace(self.path, old_path)
+            except FileNotFoundError:
+                pass
+            try:
+                os.replace(self.tmp_path, self.path)
+                break
+            except OSError:
+                # Another writer swapped its store in between; move that one aside too
+                continue
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        logger.info(f"✅ Wrote record store {self.path} with {len(self._offsets)} records")
+
+    def abort(self):
+        self._blob.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+class RecordStore:
+    """
+    Read-only, memory-mapped record store giving O(1) access to text and metadata by record id.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self._offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._columns = {
+            name: np.load(os.path.join(path, _column_file(name)), mmap_mode="r")
+            for name in self.meta["columns"]
+        }
+
+        self._blob_file, self._blob = _map_blob(os.path.join(path, BLOB_FILE))
+        self._text_blobs = {
+            name: _map_blob(os.path.join(path, _column_blob_file(name)))
+            for name, spec in self.meta["columns"].items() if spec["type"] == "text"
+        }
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def __contains__(self, record_id):
+        return self._span(record_id) is not None
+
+    def _span(self, record_id):
+        record_id = int(record_id)
+        if not 0 <= record_id < len(self._offsets):
+            return None
+        start, end = self._offsets[record_id]
+        return None if start < 0 else (int(start), int(end))
+
+    def get(self, record_id, default=None):
+        """
+        Returns the text stored for `record_id`, or `default` if there is none.
+        """
+        span = self._span(record_id)
+        if span is None:
+            return default
+        return self._blob[span[0]:span[1]].decode("utf-8")
+
+    def metadata(self, record_id):
+        """
+        Returns the metadata columns for `record_id` as a dict.
+        """
+        record_id = int(record_id)
+        if self._span(record_id) is None:
+            return {}
+        metadata = {}
+        for name, spec in self.meta["columns"].items():
+            if spec["type"] == "text":
+                start, end = self._columns[name][record_id]
+                if start >= 0:
+                    metadata[name] = self._text_blobs[name][1][int(start):int(end)].decode("utf-8")
+                continue
+            value = int(self._columns[name][record_id])
+            if value < 0:
+                continue
+            metadata[name] = spec["vocabulary"][value] if spec["type"] == "str" else value
+        return metadata
+
+    def ids(self):
+        """
+        Returns the ids of all live records.
+        """
+        return np.flatnonzero(self._offsets[:, 0] >= 0) if len(self._offsets) else np.zeros(0, dtype=np.int64)
+
+    def items(self):
+        """
+        Yields (record_id, text, metadata) for every live record without loading them all at once.
+        """
+        for record_id in self.ids():
+            yield int(record_id), self.get(record_id), self.metadata(record_id)
+
+    def close(self):
+        """
+        Releases the memory maps and file handles; the store cannot be read afterwards.
+        """
+        for blob_file, blob in [(self._blob_file, self._blob), *self._text_blobs.values()]:
+            if blob_file is not None:
+                blob.close()
+                blob_file.close()
+        self._blob_file = None
+        self._blob = b""
+        self._text_blobs = {}
+        # Dropping the arrays unmaps the .npy files
+        self._offsets = np.full((0, 2), -1, dtype=np.int64)
+        self._columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def migrate_pickle(pickle_path, store_path):
+    """
+    Converts a legacy texts.pkl / questions.pkl (a positional list or a dict of id -> text) into a record store.
+    """
+    with open(pickle_path, "rb") as f:
+        stored = pickle.load(f)
+    items = stored.items() if isinstance(stored, dict) else enumerate(stored)
+
+    writer = RecordStoreWriter(store_path)
+    for record_id, text in items:
+        writer.add(record_id, text)
+    writer.close()
+
+    logger.info(f"✅ Migrated {pickle_path} to record store {store_path}")
+
+
+def open_record_store(store_path, legacy_pickle=None):
+    """
+    Opens a record store, migrating `legacy_pickle` into it first if the store does not exist yet.
+    """
+    if not os.path.exists(os.path.join(store_path, META_FILE)) and legacy_pickle and os.path.exists(legacy_pickle):
+        migrate_pickle(legacy_pickle, store_path)
+    return RecordStore(store_path)
@@ -0,0 +1,218 @@
+import numpy as np
+import os
+import sqlite3
+import threading
+import time
+from modules.embedding_cache import normalize_query
+from modules.incremental_index import hash_text
+from modules.retrieval_engine import get_engine
+from modules.log_config import get_logger
+from modules.metrics import increment
+
+# Setup logging
+logger = get_logger(__name__, "logs/response_cache.log")
+
+RESPONSE_CACHE_PATH = "cache/responses.sqlite3"
+SIMILARITY_THRESHOLD = 0.95          # cosine similarity for a semantic hit; None disables semantic hits
+SEMANTIC_KINDS = ("answer",)         # kinds that may be served semantic hits; validation feedback needs an exact match
+TTL_SECONDS = 7 * 24 * 60 * 60       # entries older than this are never served
+MAX_ENTRIES = 10000                  # least recently used entries beyond this are evicted
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    qualifier TEXT NOT NULL,
+    context_hash TEXT NOT NULL DEFAULT '',
+    query TEXT NOT NULL,
+    embedding BLOB,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_kind ON responses (kind, created);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of LLM responses shared by every worker process.
+
+    `kind` separates the callers ("answer", "validation"). An exact hit needs the
+    same normalized query, the same `qualifier` (e.g. the selected answer) and
+    the same retrieved context. A semantic hit needs a kind in `semantic_kinds`,
+    the same qualifier and retrieved context, and a query whose embedding is
+    at least `similarity_threshold` cosine-similar, so a reworded (or negated)
+    question that retrieves different context is never served another's
+    answer. The embedding comes from the retrieval engine's embedding cache,
+    so it is normally already computed. Entries older than `ttl_seconds` are
+    never served.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, similarity_threshold=SIMILARITY_THRESHOLD,
+                 ttl_seconds=TTL_SECONDS, max_entries=MAX_ENTRIES, encode_fn=None, semantic_kinds=SEMANTIC_KINDS):
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self.semantic_kinds = tuple(semantic_kinds)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.encode_fn = encode_fn or (lambda texts: get_engine().encode(texts))
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._semantic = {}
+        self._data_version = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        # Caches created before context hashes were recorded; their entries only serve exact hits
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(responses)")}
+        if "context_hash" not in columns:
+            self._db.execute("ALTER TABLE responses ADD COLUMN context_hash TEXT NOT NULL DEFAULT ''")
+        self._db.commit()
+
+    @staticmethod
+    def _key(kind, query, context, qualifier):
+        return hash_text(kind, normalize_query(qualifier), normalize_query(query), hash_text(*context))
+
+    def _semantic_enabled(self, kind):
+        return self.similarity_threshold is not None and kind in self.semantic_kinds
+
+    def _embed(self, query):
+        vector = np.array(self.encode_fn([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _semantic_rows(self, kind):
+        """
+        Returns (keys, qualifiers, context_hashes, created, matrix) of live entries
+        of `kind`, reloaded whenever the database changed.
+        """
+        data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._semantic = {}
+            self._data_version = data_version
+        if kind not in self._semantic:
+            rows = self._db.execute(
+                "SELECT key, qualifier, context_hash, created, embedding FROM responses "
+                "WHERE kind = ? AND created >= ? AND embedding IS NOT NULL AND context_hash != ''",
+                (kind, time.time() - self.ttl_seconds)
+            ).fetchall()
+            vectors = [np.frombuffer(row[4], dtype=np.float32) for row in rows]
+            matrix = np.vstack(vectors) if vectors and len({len(v) for v in vectors}) == 1 else np.zeros((0, 0), dtype=np.float32)
+            self._semantic[kind] = (
+                [row[0] for row in rows],
+                np.array([row[1] for row in rows], dtype=object),
+                np.array([row[2] for row in rows], dtype=object),
+                np.array([row[3] for row in rows], dtype=np.float64),
+                matrix,
+            )
+        return self._semantic[kind]
+
+    def lookup(self, kind, query, context=(), qualifier=""):
+        """
+        Returns the cached response for this query, or None on a miss.
+        """
+        try:
+            key = self._key(kind, query, context, qualifier)
+            now = time.time()
+            oldest = now - self.ttl_seconds
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT response FROM responses WHERE key = ? AND created >= ?", (key, oldest)
+                ).fetchone()
+                hit = "exact_hits" if row else None
+
+                if row is None and self._semantic_enabled(kind):
+                    keys, qualifiers, context_hashes, created, matrix = self._semantic_rows(kind)
+                    vector = self._embed(query)
+                    if len(keys) and matrix.shape[1] == len(vector):
+                        similarities = matrix @ vector
+                        # Only entries for the same answer and retrieved context that have not expired since loading
+                        similarities[(qualifiers != normalize_query(qualifier))
+                                     | (context_hashes != hash_text(*context)) | (created < oldest)] = -1.0
+                        best = int(np.argmax(similarities))
+                        if similarities[best] >= self.similarity_threshold:
+                            key = keys[best]
+                            row = self._db.execute(
+                                "SELECT response FROM responses WHERE key = ? AND created >= ?", (key, oldest)
+                            ).fetchone()
+                            hit = "semantic_hits" if row else None
+
+                if row is None:
+                    self.counters["misses"] += 1
+                    increment("cache_lookups", cache="response", kind=kind, result="miss")
+                    return None
+                self.counters[hit] += 1
+                increment("cache_lookups", cache="response", kind=kind, result=hit.split("_")[0])
+                self._db.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+                self._db.commit()
+                return row[0]
+        except Exception as e:
+            logger.error(f"❌ Error reading response cache: {str(e)}", exc_info=True)
+            return None
+
+    def store(self, kind, query, context, response, qualifier=""):
+        """
+        Caches `response`, then evicts expired and least recently used entries.
+        """
+        try:
+            key = self._key(kind, query, context, qualifier)
+            embedding = self._embed(query).tobytes() if self._semantic_enabled(kind) else None
+            now = time.time()
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, kind, qualifier, context_hash, query, embedding, response, created, last_used, hits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                    (key, kind, normalize_query(qualifier), hash_text(*context), query, embedding, response, now, now)
+                )
+                self.counters["stores"] += 1
+                self._evict(now)
+                self._db.commit()
+                self._semantic.pop(kind, None)
+        except Exception as e:
+            logger.error(f"❌ Error writing response cache: {str(e)}", exc_info=True)
+
+    def _evict(self, now):
+        evicted = self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)).rowcount
+        evicted += self._db.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        if evicted:
+            self.counters["evictions"] += evicted
+            self._semantic = {}
+
+    def stats(self):
+        """
+        Returns hit/miss counters for this process plus the number of stored entries.
+        """
+        with self._lock:
+            lookups = self.counters["exact_hits"] + self.counters["semantic_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {**self.counters, "hit_rate": hits / lookups if lookups else 0.0, "size": size, "max_size": self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._semantic = {}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path=RESPONSE_CACHE_PATH, **settings):
+    """
+    Returns the process-wide ResponseCache for `path`, creating it on first use.
+    """
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path, **settings)
+        return _caches[path]
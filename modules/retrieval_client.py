@@ -0,0 +1,104 @@
+import http.client
+import json
+import socket
+import threading
+import numpy as np
+from urllib.parse import urlsplit
+from modules.log_config import get_logger
+
+# Setup logging
+logger = get_logger(__name__, "logs/retrieval_client.log")
+
+REQUEST_TIMEOUT = 60.0
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=REQUEST_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RetrievalClient:
+    """
+    Talks to a retrieval server (serve_retrieval.py) with the same search and
+    encode methods as RetrievalEngine, so `configure_engine(server_url=...)`
+    routes query_ncert, recommend_questions and everything built on them to
+    the server without loading the model or indexes in this process.
+
+    `server_url` is http://host:port or unix:///path/to/socket. Each thread
+    keeps its own keep-alive connection.
+    """
+
+    def __init__(self, server_url, timeout=REQUEST_TIMEOUT):
+        self.server_url = server_url
+        self.timeout = timeout
+        self._url = urlsplit(server_url)
+        if self._url.scheme not in ("http", "unix"):
+            raise ValueError(f"Unsupported retrieval server URL '{server_url}'. Use http://host:port or unix:///path.")
+        self._local = threading.local()
+
+    def _connect(self):
+        if self._url.scheme == "unix":
+            return _UnixHTTPConnection(self._url.path, self.timeout)
+        return http.client.HTTPConnection(self._url.hostname, self._url.port or 80, timeout=self.timeout)
+
+    def _post(self, operation, queries, top_k=None, filters=None):
+        request = {"queries": list(queries), "top_k": top_k}
+        if filters is not None:
+            request["filters"] = filters
+        # Bytes let http.client send headers and body in one packet
+        body = json.dumps(request).encode("utf-8")
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None) or self._connect()
+            self._local.connection = connection
+            try:
+                connection.request("POST", f"/{operation}", body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                payload = json.loads(response.read() or b"{}")
+                break
+            except (ConnectionError, http.client.HTTPException) as e:
+                # The server closes idle keep-alive connections; reconnect once
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise ConnectionError(f"Retrieval server {self.server_url} unavailable: {e}") from e
+        if response.status != 200:
+            raise RuntimeError(f"Retrieval server error ({response.status}): {payload.get('error')}")
+        return payload["results"]
+
+    def encode(self, texts):
+        return np.array(self._post("encode", texts), dtype=np.float32)
+
+    def search_texts(self, query_text, top_k=3, filters=None):
+        return self.search_texts_batch([query_text], top_k, filters)[0]
+
+    def search_texts_batch(self, queries, top_k=3, filters=None):
+        if not queries:
+            return []
+        return self._post("search_texts", queries, top_k, filters)
+
+    def search_chunks_batch(self, queries, top_k=3, filters=None):
+        if not queries:
+            return []
+        return [[tuple(chunk) for chunk in chunks] for chunks in self._post("search_chunks", queries, top_k, filters)]
+
+    def search_questions(self, query_text, top_k=5):
+        return self.search_questions_batch([query_text], top_k)[0]
+
+    def search_questions_batch(self, queries, top_k=5):
+        if not queries:
+            return []
+        return [[tuple(question) for question in questions] for questions in self._post("search_questions", queries, top_k)]
+
+    def health(self):
+        connection = self._connect()
+        try:
+            connection.request("GET", "/health")
+            return json.loads(connection.getresponse().read())
+        finally:
+            connection.close()
@@ -0,0 +1,375 @@
+import atexit
+import heapq
+import numpy as np
+import os
+import pandas as pd
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules.embedding_cache import EmbeddingCache, EMBEDDING_CACHE_SIZE
+from modules.encoders import (
+    check_index_encoder, default_encoder_params, encoder_key, encoder_uncased, get_encoder, resolve_encoder_params
+)
+from modules.incremental_index import MANIFEST_FILE, IngestManifest
+from modules.index_factory import INDEX_PARAMS_FILE, load_index_params, prepare_vectors, read_index
+from modules.record_store import META_FILE, open_record_store
+from modules.retrieval_client import RetrievalClient
+from modules.sharded_index import SHARD_SEARCH_WORKERS, SHARDED_INDEX_PATH, SHARDS_FILE, ShardManifest
+from modules.log_config import get_logger
+from modules.metrics import increment, span
+
+# Setup logging
+logger = get_logger(__name__, "logs/retrieval_engine.log")
+
+FAISS_INDEX_PATH = "faiss_index"
+FAISS_QA_INDEX_PATH = "faiss_qa"
+CSV_PATH = "dataset/questions.csv"
+
+# Answer option columns of the question bank, in display order
+OPTION_LABELS = ["A", "B", "C", "D", "E", "F", "I"]
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class _FileBackedResource:
+    """
+    Caches a value built from files on disk and rebuilds it when any of them changes.
+
+    `close` releases a replaced value (e.g. its memory-mapped record store). A
+    value is closed one reload after it was replaced, so searches that were
+    still using it when it was replaced can finish first.
+    """
+
+    def __init__(self, paths, loader, optional_paths=(), close=None):
+        self.paths = paths
+        self.optional_paths = list(optional_paths)
+        self.loader = loader
+        self.close = close
+        self._value = None
+        self._retired = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        stamp = tuple(_file_stamp(path) for path in self.paths + self.optional_paths)
+        with self._lock:
+            if self._value is None or stamp != self._stamp:
+                missing = [path for path, file_stamp in zip(self.paths, stamp) if file_stamp is None]
+                if missing:
+                    raise FileNotFoundError(f"Missing index files: {', '.join(missing)}")
+                value = self.loader()
+                if self.close is not None and self._retired is not None:
+                    self.close(self._retired)
+                self._retired = self._value
+                self._value = value
+                self._stamp = stamp
+                logger.info(f"✅ Loaded {', '.join(self.paths)}")
+            return self._value
+
+
+def _close_store(value):
+    # Index values are (faiss_index, record_store, ...)
+    value[1].close()
+
+
+class RetrievalEngine:
+    """
+    Long-lived holder for the query encoder, the NCERT chunk index (flat or
+    sharded by chapter) and the question index.
+
+    Everything is loaded lazily on first use and reloaded when the files on disk change.
+    Chunk searches with `filters` (e.g. {"class": 11, "chapter": [1, 2]}) only
+    search the matching shards under `shard_path`, in parallel on up to
+    `shard_workers` threads, and merge their top-k by score.
+    `encoder` picks the encoder backend (see modules.encoders; the configured
+    default when None). An index built with an incompatible encoder is rejected
+    when it is loaded.
+    """
+
+    def __init__(self, encoder=None, index_path=FAISS_INDEX_PATH,
+                 qa_index_path=FAISS_QA_INDEX_PATH,
+                 embedding_cache_size=EMBEDDING_CACHE_SIZE, embedding_cache_path=None,
+                 shard_path=SHARDED_INDEX_PATH, shard_workers=SHARD_SEARCH_WORKERS, csv_path=CSV_PATH):
+        self.encoder_params = resolve_encoder_params(encoder) if encoder is not None else default_encoder_params()
+        self.index_path = index_path
+        self.qa_index_path = qa_index_path
+        self.shard_path = shard_path
+        self.shard_workers = shard_workers
+        self.csv_path = csv_path
+        self.embedding_cache = EmbeddingCache(
+            embedding_cache_size, embedding_cache_path,
+            namespace=encoder_key(self.encoder_params), lowercase=encoder_uncased(self.encoder_params)
+        )
+        if embedding_cache_path:
+            atexit.register(self.embedding_cache.save)
+
+        # Record stores are swapped in as whole directories, so watching meta.json catches rewrites;
+        # legacy pickles are watched so they get migrated when present
+        self._texts = self._chunk_index(index_path, "NCERT")
+        self._questions = _FileBackedResource(
+            [os.path.join(qa_index_path, "qa_index.bin")],
+            self._load_question_index,
+            optional_paths=[
+                os.path.join(qa_index_path, "questions", META_FILE),
+                os.path.join(qa_index_path, "questions.pkl"),
+                os.path.join(qa_index_path, INDEX_PARAMS_FILE),
+                csv_path,
+            ],
+            close=_close_store
+        )
+        self._shard_manifest = _FileBackedResource([os.path.join(shard_path, SHARDS_FILE)], self._load_shard_manifest)
+        self._shards = {}
+        self._shards_lock = threading.Lock()
+        self._executor = None
+
+    def _chunk_index(self, index_dir, index_name):
+        return _FileBackedResource(
+            [os.path.join(index_dir, "faiss_index.bin")],
+            lambda: self._load_chunk_index(index_dir, index_name),
+            optional_paths=[
+                os.path.join(index_dir, "texts", META_FILE),
+                os.path.join(index_dir, "texts.pkl"),
+                os.path.join(index_dir, INDEX_PARAMS_FILE),
+            ],
+            close=_close_store
+        )
+
+    @property
+    def encoder(self):
+        return get_encoder(self.encoder_params)
+
+    def _check_encoder(self, index_dir, index_name):
+        manifest = IngestManifest(os.path.join(index_dir, MANIFEST_FILE))
+        check_index_encoder(manifest.settings, self.encoder_params, index_name)
+
+    def _load_chunk_index(self, index_dir, index_name):
+        self._check_encoder(index_dir, index_name)
+        with span("index_load", index="texts"):
+            faiss_index = read_index(os.path.join(index_dir, "faiss_index.bin"))
+            stored_texts = open_record_store(os.path.join(index_dir, "texts"), os.path.join(index_dir, "texts.pkl"))
+        return faiss_index, stored_texts, load_index_params(index_dir)
+
+    def _load_shard_manifest(self):
+        manifest = ShardManifest(self.shard_path)
+        check_index_encoder(manifest.settings, self.encoder_params, "sharded NCERT")
+        return manifest
+
+    def _shard(self, manifest, key):
+        with self._shards_lock:
+            shard = self._shards.get(key)
+            if shard is None:
+                shard = self._shards[key] = self._chunk_index(manifest.shard_dir(key), f"{key} shard")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.shard_workers, thread_name_prefix="shard-search")
+        return shard
+
+    def _load_question_index(self):
+        self._check_encoder(self.qa_index_path, "question")
+        with span("index_load", index="questions"):
+            faiss_index = read_index(os.path.join(self.qa_index_path, "qa_index.bin"))
+            question_bank = open_record_store(
+                os.path.join(self.qa_index_path, "questions"), os.path.join(self.qa_index_path, "questions.pkl")
+            )
+        legacy_options = None
+        if "option_A" not in question_bank.meta["columns"]:
+            logger.warning("⚠ Question bank has no compiled options; reading them from the CSV until store_questions rebuilds it.")
+            legacy_options = self._legacy_options()
+        return faiss_index, question_bank, load_index_params(self.qa_index_path), legacy_options
+
+    def _legacy_options(self):
+        """
+        Returns the options of a question bank migrated from a legacy questions.pkl,
+        whose record ids are positions among the CSV rows that have a question.
+        """
+        try:
+            df = pd.read_csv(self.csv_path)
+        except FileNotFoundError:
+            logger.error(f"❌ {self.csv_path} not found; recommended questions will have no options.")
+            return []
+        rows = df[df["Question"].notna()].fillna("").astype(str)
+        labels = [label for label in OPTION_LABELS if label in rows.columns]
+        return [
+            [" ".join(record[label].split()) if label in labels else "" for label in OPTION_LABELS]
+            for record in rows[labels].to_dict("records")
+        ]
+
+    def encode(self, texts):
+        """
+        Encodes a list of query texts into a float32 embedding matrix, consulting the embedding cache first.
+        """
+        return self.embedding_cache.get_many(texts, self._encode_uncached)
+
+    def _encode_uncached(self, texts):
+        with span("encode", stage="query"):
+            return self.encoder.encode(texts).astype(np.float32)
+
+    def search_texts(self, query_text, top_k=3, filters=None):
+        """
+        Returns the `top_k` NCERT chunks closest to `query_text`.
+        """
+        return self.search_texts_batch([query_text], top_k, filters)[0]
+
+    def search_texts_batch(self, queries, top_k=3, filters=None):
+        """
+        Returns the `top_k` NCERT chunks for each query, in input order, using one encode and one search.
+        """
+        if not queries:
+            return []
+        if filters is not None:
+            return [[text for text, _, _ in chunks] for chunks in self._search_shards(queries, top_k, filters)]
+        faiss_index, stored_texts, index_params = self._texts.get()
+        # Normalized inner-product indexes need normalized queries
+        query_vectors = prepare_vectors(self.encode(list(queries)), index_params)
+        with span("faiss_search", index="texts"):
+            _, indices = faiss_index.search(query_vectors, top_k)
+        results = []
+        for row in indices:
+            texts = (stored_texts.get(i) for i in row if i >= 0)
+            results.append([text for text in texts if text is not None])
+        return results
+
+    def search_chunks_batch(self, queries, top_k=3, filters=None):
+        """
+        Like `search_texts_batch`, but returns (text, metadata, score) for every chunk.
+
+        Metadata holds the chunk's source, page and start_index/end_index, and a
+        higher score is always closer whatever the index metric.
+        """
+        if not queries:
+            return []
+        if filters is not None:
+            return self._search_shards(queries, top_k, filters)
+        return self._search_chunks(self._texts, self.encode(list(queries)), top_k)[1]
+
+    @staticmethod
+    def _search_chunks(chunk_index, embeddings, top_k, index_label="texts"):
+        """
+        Searches one chunk index with already-encoded queries and returns (metric, chunks per query).
+        """
+        faiss_index, stored_texts, index_params = chunk_index.get()
+        query_vectors = prepare_vectors(embeddings, index_params)
+        with span("faiss_search", index=index_label):
+            distances, indices = faiss_index.search(query_vectors, top_k)
+        # Inner products grow with similarity, L2 distances shrink
+        scores = distances if index_params["metric"] == "ip" else -distances
+
+        results = []
+        for row, row_scores in zip(indices, scores):
+            chunks = []
+            for i, score in zip(row, row_scores):
+                text = stored_texts.get(i) if i >= 0 else None
+                if text is not None:
+                    chunks.append((text, stored_texts.metadata(i), float(score)))
+            results.append(chunks)
+        return index_params["metric"], results
+
+    def _search_shards(self, queries, top_k, filters):
+        """
+        Searches the shards matching `filters` in parallel and merges each query's top_k by score.
+        """
+        manifest = self._shard_manifest.get()
+        keys = manifest.select(filters)
+        if not keys:
+            logger.warning(f"⚠ No NCERT shards match {filters}.")
+            return [[] for _ in queries]
+
+        embeddings = self.encode(list(queries))
+        shards = [self._shard(manifest, key) for key in keys]
+        increment("shard_searches", len(keys))
+        with span("shard_search", shards=len(keys)):
+            if len(shards) == 1:
+                shard_results = [self._search_chunks(shards[0], embeddings, top_k, "shard")]
+            else:
+                searches = [self._executor.submit(self._search_chunks, shard, embeddings, top_k, "shard") for shard in shards]
+                shard_results = [search.result() for search in searches]
+
+        # L2 and inner-product scores are on different scales, so they cannot be merged
+        metrics = {metric for metric, _ in shard_results}
+        if len(metrics) > 1:
+            raise ValueError(f"Shards {', '.join(keys)} mix {' and '.join(sorted(metrics))} metrics; rebuild them with the same index_params.")
+        logger.debug(f"Searched {len(keys)} of {len(manifest.shards)} shards "
+                     f"({manifest.vectors(keys)} of {manifest.vectors()} vectors) for {filters}")
+
+        return [
+            heapq.nlargest(top_k, (chunk for _, results in shard_results for chunk in results[row]), key=lambda chunk: chunk[2])
+            for row in range(len(queries))
+        ]
+
+    def search_questions(self, query_text, top_k=5):
+        """
+        Returns the `top_k` stored questions closest to `query_text` as (question, options) pairs.
+        """
+        return self.search_questions_batch([query_text], top_k)[0]
+
+    def search_questions_batch(self, queries, top_k=5):
+        """
+        Returns (question, options) pairs for each query, in input order, using one encode and one search.
+        """
+        if not queries:
+            return []
+        faiss_index, question_bank, index_params, legacy_options = self._questions.get()
+        query_vectors = prepare_vectors(self.encode(list(queries)), index_params)
+        with span("faiss_search", index="questions"):
+            _, indices = faiss_index.search(query_vectors, top_k)
+
+        results = []
+        for row in indices:
+            recommended_questions = []
+            for i in row:
+                question_text = question_bank.get(i) if i >= 0 else None
+                if question_text is None:
+                    continue
+                if legacy_options is not None:
+                    question_options = legacy_options[i] if i < len(legacy_options) else [""] * len(OPTION_LABELS)
+                else:
+                    metadata = question_bank.metadata(i)
+                    question_options = [metadata.get(f"option_{label}", "") for label in OPTION_LABELS]
+                recommended_questions.append((question_text, question_options))
+            results.append(recommended_questions)
+        return results
+
+
+_engine = None
+_engine_settings = {}
+_engine_lock = threading.Lock()
+
+
+def _create_engine(settings):
+    if settings.get("server_url"):
+        return RetrievalClient(**settings)
+    return RetrievalEngine(**settings)
+
+
+def configure_engine(**settings):
+    """
+    Sets the keyword arguments used to build the shared RetrievalEngine.
+
+    Calling it again with the same settings keeps the existing engine, so it is
+    safe to call on every Streamlit rerun. With `server_url` (and optionally
+    `timeout`) a RetrievalClient for a shared retrieval server is used instead.
+    """
+    global _engine, _engine_settings
+    with _engine_lock:
+        if _engine is not None and settings == _engine_settings:
+            return _engine
+        if isinstance(_engine, RetrievalEngine):
+            _engine.embedding_cache.save()
+        _engine_settings = settings
+        _engine = _create_engine(settings)
+        return _engine
+
+
+def get_engine():
+    """
+    Returns the process-wide RetrievalEngine shared by query_engine and question_recommend.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = _create_engine(_engine_settings)
+    return _engine
@@ -0,0 +1,308 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from modules.retrieval_engine import get_engine
+from modules.log_config import get_logger
+from modules.metrics import increment, observe, prometheus_text, span
+
+# Setup logging
+logger = get_logger(__name__, "logs/retrieval_server.log")
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+MAX_BATCH_SIZE = 64        # queries encoded and searched together at most
+MAX_WAIT_MS = 5.0          # how long the first request of a batch waits for others
+REQUEST_TIMEOUT = 60.0     # seconds a request may wait for its batch
+SOCKET_TIMEOUT = 30.0      # seconds a connection may stall mid-request or sit idle before it is closed
+
+# Operations whose handler takes shard "filters"
+FILTERED_OPERATIONS = ("search_texts", "search_chunks")
+
+
+class _Request:
+    def __init__(self, queries, top_k, options):
+        self.queries = queries
+        self.top_k = top_k
+        self.options = options
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into one call of `handler(queries, top_k, **options)`.
+
+    A worker thread takes the first waiting request, then keeps collecting
+    requests for up to `max_wait_ms` or until `max_batch_size` queries are
+    waiting, and runs them as one batched encode + FAISS search with the
+    largest requested top_k. It only waits while other requests have been
+    announced but not yet submitted, so a lone request is never delayed.
+    With `trim`, each request's results are cut back to its own top_k.
+    Requests with different options (e.g. shard filters) share a batch but
+    are run in one handler call per distinct set of options.
+    """
+
+    def __init__(self, name, handler, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, trim=True):
+        self.name = name
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.trim = trim
+        self._queue = queue.Queue()
+        self._arriving = 0
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._worker.start()
+
+    def announce(self):
+        """
+        Marks a request as on its way (e.g. while its body is read) so the batch being collected waits for it.
+        """
+        with self._lock:
+            self._arriving += 1
+
+    def withdraw(self):
+        with self._lock:
+            self._arriving -= 1
+
+    def submit(self, queries, top_k=None, announced=False, **options):
+        """
+        Queues `queries` and returns a Future resolving to one result per query.
+        """
+        if announced:
+            self.withdraw()
+        request = _Request(list(queries), top_k, {key: value for key, value in options.items() if value is not None})
+        if not request.queries:
+            request.future.set_result([])
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.queries)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            with self._lock:
+                arriving = self._arriving
+            if not arriving and self._queue.empty():
+                break
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.queries)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            for request in batch:
+                observe("server_queue_wait", started - request.enqueued, op=self.name)
+            groups = {}
+            for request in batch:
+                groups.setdefault(json.dumps(request.options, sort_keys=True), []).append(request)
+            for group in groups.values():
+                self._run_batch(group)
+
+    def _run_batch(self, batch):
+        queries = [query for request in batch for query in request.queries]
+        top_k = max((request.top_k or 0 for request in batch), default=0) or None
+        options = batch[0].options
+        increment("server_batches", op=self.name)
+        increment("server_batched_queries", len(queries), op=self.name)
+
+        try:
+            with span("server_batch", op=self.name):
+                results = self.handler(queries, top_k, **options) if top_k else self.handler(queries, **options)
+        except Exception as e:
+            logger.error(f"❌ Batch of {len(queries)} {self.name} queries failed: {str(e)}", exc_info=True)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        position = 0
+        for request in batch:
+            request_results = results[position:position + len(request.queries)]
+            position += len(request.queries)
+            if self.trim and request.top_k:
+                request_results = [result[:request.top_k] for result in request_results]
+            request.future.set_result(request_results)
+
+
+def create_batchers(engine=None, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+    """
+    Returns a MicroBatcher for each retrieval operation of `engine` (the shared engine by default).
+    """
+    engine = engine or get_engine()
+    settings = {"max_batch_size": max_batch_size, "max_wait_ms": max_wait_ms}
+    return {
+        "search_texts": MicroBatcher("search_texts", engine.search_texts_batch, **settings),
+        "search_chunks": MicroBatcher("search_chunks", engine.search_chunks_batch, **settings),
+        "search_questions": MicroBatcher("search_questions", engine.search_questions_batch, **settings),
+        "encode": MicroBatcher("encode", lambda texts, _=None: engine.encode(texts).tolist(), trim=False, **settings),
+    }
+
+
+class RetrievalRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /<operation> with {"queries": [...], "top_k": k} (plus "filters" for
+    sharded chunk searches) returns {"results": [...]};
+    GET /health and GET /metrics (Prometheus text) are also served.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # A client that stalls while sending its body cannot hold a worker thread forever
+    timeout = SOCKET_TIMEOUT
+
+    def setup(self):
+        # Headers and body are written separately, so Nagle's algorithm would delay every response
+        self.disable_nagle_algorithm = self.server.address_family != socket.AF_UNIX
+        super().setup()
+
+    def _send(self, status, body, content_type="application/json"):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, json.dumps({"status": "ok", "operations": sorted(self.server.batchers)}))
+        elif self.path == "/metrics":
+            self._send(200, prometheus_text(), "text/plain; version=0.0.4")
+        else:
+            self._send(404, json.dumps({"error": f"Unknown path {self.path}"}))
+
+    @staticmethod
+    def _invalid(body, operation):
+        """
+        Returns why a request body cannot be batched, or None; a bad request must not fail the whole batch.
+        """
+        if not isinstance(body, dict):
+            return "Body must be a JSON object"
+        queries = body.get("queries", [])
+        if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+            return "queries must be a list of strings"
+        top_k = body.get("top_k")
+        if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1):
+            return "top_k must be a positive integer"
+        if not isinstance(body.get("filters", {}), (dict, type(None))):
+            return "filters must be a JSON object"
+        if body.get("filters") is not None and operation not in FILTERED_OPERATIONS:
+            return f"filters are only supported by {' and '.join(FILTERED_OPERATIONS)}"
+        return None
+
+    def do_POST(self):
+        operation = self.path.strip("/")
+        batcher = self.server.batchers.get(operation)
+        announced = batcher is not None
+        if announced:
+            batcher.announce()
+        # Every path out of here must withdraw the announcement, or later batches wait for a request that never comes
+        try:
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except ValueError as e:
+                self._send(400, json.dumps({"error": f"Invalid JSON: {e}"}))
+                return
+            if batcher is None:
+                self._send(404, json.dumps({"error": f"Unknown operation {self.path}"}))
+                return
+            error = self._invalid(body, operation)
+            if error:
+                self._send(400, json.dumps({"error": error}))
+                return
+            options = {"filters": body.get("filters")} if operation in FILTERED_OPERATIONS else {}
+            announced = False
+            future = batcher.submit(body.get("queries", []), body.get("top_k"), announced=True, **options)
+        finally:
+            if announced:
+                batcher.withdraw()
+
+        try:
+            results = future.result(REQUEST_TIMEOUT)
+            self._send(200, json.dumps({"results": results}))
+        except Exception as e:
+            self._send(500, json.dumps({"error": f"{type(e).__name__}: {e}"}))
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class RetrievalHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, batchers):
+        self.batchers = batchers
+        super().__init__(address, RetrievalRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        for batcher in self.batchers.values():
+            batcher.close()
+
+
+class UnixRetrievalHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, batchers):
+        self.batchers = batchers
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, RetrievalRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        for batcher in self.batchers.values():
+            batcher.close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def create_server(host=SERVER_HOST, port=SERVER_PORT, socket_path=None, engine=None,
+                  max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+    """
+    Builds a retrieval server on `host`:`port`, or on a Unix socket when `socket_path` is given.
+
+    Call `serve_forever()` on the result; `server_address` holds the bound address.
+    """
+    batchers = create_batchers(engine, max_batch_size, max_wait_ms)
+    if socket_path:
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix sockets are not supported on this platform.")
+        server = UnixRetrievalHTTPServer(socket_path, batchers)
+        logger.info(f"✅ Retrieval server listening on unix://{socket_path}")
+    else:
+        server = RetrievalHTTPServer((host, port), batchers)
+        logger.info(f"✅ Retrieval server listening on http://{host}:{server.server_address[1]}")
+    return server
@@ -0,0 +1,96 @@
+import json
+import os
+import re
+from modules.log_config import get_logger
+
+# Setup logging
+logger = get_logger(__name__, "logs/sharded_index.log")
+
+SHARDED_INDEX_PATH = "faiss_shards"
+SHARDS_FILE = "shards.json"
+SHARD_SEARCH_WORKERS = 4
+
+# NCERT file names encode class, language, subject, book part and chapter: kebo101 is
+# Class 11 (k), English (e), Biology (bo), part 1, chapter 01; lebo1xx is Class 12
+NCERT_FILE_PATTERN = re.compile(r"^(?P<class>[a-z])e(?P<subject>[a-z]{2})(?P<part>\d)(?P<chapter>\d{2})$")
+NCERT_CLASS_CODES = {"i": 9, "j": 10, "k": 11, "l": 12}
+
+# Shard fields that query filters can match on
+FILTER_FIELDS = ("class", "subject", "chapter", "shard")
+
+
+def shard_key(source):
+    """
+    Returns the shard a source PDF belongs to: one shard per chapter file, named after it (e.g. "kebo101").
+    """
+    return os.path.splitext(os.path.basename(str(source)))[0].lower()
+
+
+def shard_info(key):
+    """
+    Returns the class, subject and chapter of an NCERT shard key ({} for other names).
+    """
+    match = NCERT_FILE_PATTERN.match(key)
+    if not match or match["class"] not in NCERT_CLASS_CODES:
+        return {}
+    return {"class": NCERT_CLASS_CODES[match["class"]], "subject": match["subject"], "chapter": int(match["chapter"])}
+
+
+def _as_set(value):
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return {str(item) for item in values}
+
+
+def matches(key, entry, filters):
+    """
+    Returns True when the shard `key` satisfies every filter, e.g. {"class": 12, "chapter": [5, 6]}.
+    """
+    for field, wanted in filters.items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown shard filter '{field}'. Use one of {', '.join(FILTER_FIELDS)}.")
+        if wanted is None:
+            continue
+        value = key if field == "shard" else entry.get(field)
+        if value is None or str(value) not in _as_set(wanted):
+            return False
+    return True
+
+
+class ShardManifest:
+    """
+    Lists the shards of a sharded chunk index with their class, chapter, sources and vector count.
+
+    Each shard is a complete incremental index (see incremental_index) in its own
+    folder, so it can be rebuilt on its own; `settings` records the encoder.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.path = os.path.join(index_path, SHARDS_FILE)
+        self.settings = {}
+        self.shards = {}
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.settings = data.get("settings", {})
+            self.shards = data.get("shards", {})
+
+    def shard_dir(self, key):
+        return os.path.join(self.index_path, key)
+
+    def select(self, filters=None):
+        """
+        Returns the keys of the shards matching `filters` (all shards when empty).
+        """
+        return [key for key, entry in sorted(self.shards.items()) if matches(key, entry, filters or {})]
+
+    def vectors(self, keys=None):
+        return sum(self.shards[key].get("vectors", 0) for key in (self.shards if keys is None else keys))
+
+    def save(self):
+        os.makedirs(self.index_path, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self.settings, "shards": self.shards}, f, indent=2)
+        os.replace(tmp_path, self.path)
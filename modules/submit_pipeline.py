@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from modules.context_assembly import ANSWER_TOKEN_BUDGET, assemble_context
+from modules.query_engine import query_ncert_chunks_batch
+from modules.question_recommend import recommend_questions
+from modules.log_config import get_logger
+from modules.metrics import observe
+
+# Setup logging
+logger = get_logger(__name__, "logs/submit_pipeline.log")
+
+ANSWER_ERROR = "⚠ Error: No response generated."
+SYSTEM_PROMPT = "You are an expert in NEET exam biology questions. Provide precise answers."
+
+# Recommendation runs here while the answer streams
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="submit-pipeline")
+
+
+def build_answer_prompt(user_query, context):
+    """
+    Returns the chat messages asking the model to answer `user_query` from the retrieved `context`.
+    """
+    combined_context = "\n".join(context)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{combined_context}\n\nQuestion:\n{user_query}\n\nAnswer:"}
+    ]
+
+
+class AnswerStream:
+    """
+    One submitted question: iterate it to stream the answer text as the model
+    produces it, then read `answer`, `recommendations()` and `timings`.
+
+    Timings (seconds since submit): retrieval_s, ttft_s (first answer token),
+    total_s (last answer token) and recommend_s. `cached` is True when the
+    answer came from the response cache instead of the model.
+    """
+
+    def __init__(self, chat_model, user_query, context, recommendation, started, timings, cache=None, cached_answer=None):
+        self.chat_model = chat_model
+        self.user_query = user_query
+        self.context = context
+        self.prompt = build_answer_prompt(user_query, context)
+        self.started = started
+        self.timings = timings
+        self.cache = cache
+        self.cached = cached_answer is not None
+        self.answer = cached_answer or ""
+        self._recommendation = recommendation
+
+    def __iter__(self):
+        if self.cached:
+            self.timings["ttft_s"] = self.timings["total_s"] = time.perf_counter() - self.started
+            observe("request", self.timings["total_s"], kind="submit", cached=True)
+            logger.info(f"⏱ Query: {self.user_query} | cached | ttft_s={self.timings['ttft_s']:.3f}")
+            yield self.answer
+            return
+
+        parts = []
+        failed = False
+        llm_started = time.perf_counter()
+        try:
+            for chunk in self.chat_model.stream(self.prompt):
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if not text:
+                    continue
+                if "ttft_s" not in self.timings:
+                    self.timings["ttft_s"] = time.perf_counter() - self.started
+                    observe("llm_ttft", time.perf_counter() - llm_started, kind="answer")
+                parts.append(text)
+                yield text
+        except Exception as e:
+            logger.error(f"❌ Error generating answer: {str(e)}", exc_info=True)
+            failed = True
+            if not parts:
+                parts.append(ANSWER_ERROR)
+                yield ANSWER_ERROR
+
+        self.answer = "".join(parts)
+        self.timings["total_s"] = time.perf_counter() - self.started
+        observe("llm_call", time.perf_counter() - llm_started, kind="answer", **({"error": "stream"} if failed else {}))
+        observe("request", self.timings["total_s"], kind="submit", cached=False)
+        if "ttft_s" in self.timings:
+            observe("request_ttft", self.timings["ttft_s"], kind="submit")
+        if self.cache is not None and not failed and self.answer:
+            self.cache.store("answer", self.user_query, self.context, self.answer)
+        logger.info(f"⏱ Query: {self.user_query} | " + " ".join(f"{key}={value:.3f}" for key, value in self.timings.items()))
+
+    def recommendations(self, timeout=None):
+        """
+        Waits for the practice questions recommended alongside the answer.
+        """
+        return self._recommendation.result(timeout)
+
+
+def submit_query(chat_model, user_query, top_k=5, recommend_top_k=5, cache=None, token_budget=ANSWER_TOKEN_BUDGET):
+    """
+    Runs the "Submit Question" flow and returns an AnswerStream.
+
+    The query's context is retrieved first (which also caches its embedding),
+    then practice questions are recommended in the background while the
+    answer is streamed from `chat_model.stream`, so neither waits on the other.
+    The retrieved chunks are merged, de-duplicated and packed into `token_budget` prompt tokens.
+    With a ResponseCache, a cached answer for the same (or a near-identical)
+    question is returned without calling the model, and new answers are stored.
+    """
+    started = time.perf_counter()
+    timings = {}
+
+    retrieved_context = assemble_context(query_ncert_chunks_batch([user_query], top_k=top_k)[0], token_budget, kind="answer")
+    timings["retrieval_s"] = time.perf_counter() - started
+
+    def recommend():
+        recommended = recommend_questions(user_query, top_k=recommend_top_k)
+        timings["recommend_s"] = time.perf_counter() - started
+        return recommended
+
+    recommendation = _executor.submit(recommend)
+    cached_answer = cache.lookup("answer", user_query, retrieved_context) if cache is not None else None
+    return AnswerStream(chat_model, user_query, retrieved_context, recommendation, started, timings, cache, cached_answer)
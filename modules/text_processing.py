@@ -1,21 +1,61 @@
 import re
-import logging
+import numpy as np
+import tiktoken
+from functools import lru_cache
+from langchain.schema import Document
 from langchain.text_splitter import TokenTextSplitter
+from modules.log_config import get_logger
 
 # Setup logging
-logging.basicConfig(filename="logs/text_processing.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = get_logger(__name__, "logs/text_processing.log")
+
+# Precompiled for the legacy path; the fast path avoids regexes altogether
+MULTIPLE_NEWLINES = re.compile(r'\n+')
+WHITESPACE = re.compile(r'\s+')
+NON_ASCII = re.compile(r'[^\x00-\x7F]+')
+
+# Threads tiktoken uses to encode a batch of documents
+TOKENIZER_THREADS = 8
+
+
+@lru_cache(maxsize=None)
+def _token_lengths(encoding_name):
+    """
+    Returns the byte length of every token id of an encoding, for computing chunk offsets.
+    """
+    encoding = tiktoken.get_encoding(encoding_name)
+    return np.array([len(encoding.decode_single_token_bytes(token)) for token in range(encoding.n_vocab)], dtype=np.int64)
+
 
 class TextProcessor:
-    def __init__(self, encoding="gpt2", chunk_size=512, chunk_overlap=100):
+    def __init__(self, encoding="gpt2", chunk_size=512, chunk_overlap=100, fast=True, num_threads=TOKENIZER_THREADS):
         """
         Initializes text processor with TokenTextSplitter.
+
+        With `fast` (the default) pages are cleaned without regexes, tokenized
+        once in batches and sliced into token windows directly, producing the same
+        chunks as TokenTextSplitter. `fast=False` keeps the original per-call path.
         """
+        if chunk_size <= chunk_overlap:
+            raise ValueError("chunk_size must be greater than chunk_overlap")
+        self.encoding_name = encoding
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.fast = fast
+        self.num_threads = num_threads
         self.text_splitter = TokenTextSplitter(
             encoding_name=encoding,
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap
         )
-        logging.info(f"✅ Initialized TokenTextSplitter with chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
+        self.encoding = tiktoken.get_encoding(encoding)
+        logger.info(f"✅ Initialized TokenTextSplitter with chunk_size={chunk_size}, chunk_overlap={chunk_overlap}, fast={fast}")
+
+    def settings(self):
+        """
+        Returns the settings that determine the chunks (`fast` and threads do not change them).
+        """
+        return {"encoding": self.encoding_name, "chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap}
 
     def clean_text(self, text):
         """
@@ -23,32 +63,111 @@ class TextProcessor:
         """
         try:
             # Remove multiple newlines and extra spaces
-            text = re.sub(r'\n+', '\n', text)  # Remove extra newlines
-            text = re.sub(r'\s+', ' ', text)  # Remove excessive spaces
+            text = MULTIPLE_NEWLINES.sub('\n', text)  # Remove extra newlines
+            text = WHITESPACE.sub(' ', text)  # Remove excessive spaces
 
             # Remove non-ASCII characters (optional)
-            text = re.sub(r'[^\x00-\x7F]+', '', text)
+            text = NON_ASCII.sub('', text)
 
             # Normalize dashes and hyphens
             text = text.replace("–", "-").replace("—", "-")
 
-            logging.info("✅ Successfully cleaned text.")
+            logger.info("✅ Successfully cleaned text.")
             return text.strip()
 
         except Exception as e:
-            logging.error(f"❌ Error cleaning text: {str(e)}", exc_info=True)
+            logger.error(f"❌ Error cleaning text: {str(e)}", exc_info=True)
             return text  # Return original if error occurs
 
+    @staticmethod
+    def clean_text_fast(text):
+        """
+        Same result as `clean_text` in a single pass: collapse whitespace, drop non-ASCII, strip.
+        """
+        return " ".join(text.split()).encode("ascii", "ignore").decode("ascii").strip()
+
+    def _windows(self, num_tokens):
+        """
+        Yields (start, end) token windows with TokenTextSplitter's chunk_size/chunk_overlap semantics.
+        """
+        start = 0
+        while start < num_tokens:
+            end = min(start + self.chunk_size, num_tokens)
+            yield start, end
+            if end == num_tokens:
+                break
+            start += self.chunk_size - self.chunk_overlap
+
+    def _encode_batch(self, texts):
+        try:
+            return self.encoding.encode_batch(texts, num_threads=self.num_threads, allowed_special=set(), disallowed_special="all")
+        except ValueError:
+            # A page containing a special token such as <|endoftext|> yields no chunks, as with TokenTextSplitter
+            token_batches = []
+            for text in texts:
+                try:
+                    token_batches.append(self.encoding.encode(text, allowed_special=set(), disallowed_special="all"))
+                except ValueError as e:
+                    logger.error(f"❌ Failed to split text: {str(e)}")
+                    token_batches.append([])
+            return token_batches
+
+    def split_spans(self, texts):
+        """
+        Splits many texts at once, returning for each a list of (chunk, start, end)
+        where start/end are character offsets into the cleaned text.
+        """
+        cleaned = [self.clean_text_fast(text) for text in texts]
+        lengths = _token_lengths(self.encoding_name)
+
+        results = []
+        for text, tokens in zip(cleaned, self._encode_batch(cleaned)):
+            # Cleaned text is ASCII, so token byte lengths are character lengths
+            boundaries = np.zeros(len(tokens) + 1, dtype=np.int64)
+            np.cumsum(lengths[tokens], out=boundaries[1:])
+            spans = []
+            for start, end in self._windows(len(tokens)):
+                start_char, end_char = int(boundaries[start]), int(boundaries[end])
+                spans.append((text[start_char:end_char], start_char, end_char))
+            results.append(spans)
+        return results
+
     def split_text(self, text):
         """
         Splits cleaned text into smaller token-based chunks.
         """
+        if self.fast:
+            return [chunk for chunk, _, _ in self.split_spans([text])[0]]
         try:
             cleaned_text = self.clean_text(text)
             chunks = self.text_splitter.split_text(cleaned_text)
 
-            logging.info(f"✅ Successfully split text into {len(chunks)} chunks.")
+            logger.info(f"✅ Successfully split text into {len(chunks)} chunks.")
             return chunks
         except Exception as e:
-            logging.error(f"❌ Failed to split text: {str(e)}", exc_info=True)
+            logger.error(f"❌ Failed to split text: {str(e)}", exc_info=True)
             return []
+
+    def split_documents(self, documents):
+        """
+        Splits loaded pages into chunk `Document`s in one batch.
+
+        Each chunk keeps its page's metadata (source, page) plus its `chunk`
+        number within the page and `start_index`/`end_index` character offsets
+        into the cleaned page text.
+        """
+        documents = list(documents)
+        if not self.fast:
+            return [
+                Document(page_content=text, metadata={**doc.metadata, "chunk": chunk})
+                for doc in documents
+                for chunk, text in enumerate(self.split_text(doc.page_content))
+            ]
+
+        split_docs = [
+            Document(page_content=text, metadata={**doc.metadata, "chunk": chunk, "start_index": start, "end_index": end})
+            for doc, spans in zip(documents, self.split_spans([doc.page_content for doc in documents]))
+            for chunk, (text, start, end) in enumerate(spans)
+        ]
+        logger.info(f"✅ Split {len(documents)} pages into {len(split_docs)} chunks.")
+        return split_docs
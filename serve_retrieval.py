@@ -0,0 +1,52 @@
+import argparse
+import logging
+from modules.encoders import DEFAULT_ENCODER_PARAMS, ENCODER_BACKENDS, configure_encoder
+from modules.retrieval_engine import configure_engine, get_engine, FAISS_INDEX_PATH, FAISS_QA_INDEX_PATH
+from modules.sharded_index import SHARDED_INDEX_PATH
+from modules.retrieval_server import MAX_BATCH_SIZE, MAX_WAIT_MS, SERVER_HOST, SERVER_PORT, create_server
+
+# Setup logging
+logging.basicConfig(filename="logs/serve_retrieval.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve query_ncert/recommend_questions from one process with micro-batching.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of host:port")
+    parser.add_argument("--index-path", default=FAISS_INDEX_PATH)
+    parser.add_argument("--qa-index-path", default=FAISS_QA_INDEX_PATH)
+    parser.add_argument("--shard-path", default=SHARDED_INDEX_PATH, help="sharded NCERT index searched by filtered queries")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE, help="most queries encoded and searched together")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS, help="how long a request waits for others to batch with")
+    parser.add_argument("--encoder-backend", choices=ENCODER_BACKENDS, default=DEFAULT_ENCODER_PARAMS["backend"])
+    parser.add_argument("--encoder-threads", type=int, help="CPU threads for the encoder (default: the library's own)")
+    parser.add_argument("--encoder-batch-size", type=int, default=DEFAULT_ENCODER_PARAMS["batch_size"])
+    parser.add_argument("--no-warmup", action="store_true", help="load the model and indexes on the first request instead of at startup")
+    args = parser.parse_args()
+
+    configure_encoder(backend=args.encoder_backend, num_threads=args.encoder_threads, batch_size=args.encoder_batch_size)
+    configure_engine(index_path=args.index_path, qa_index_path=args.qa_index_path, shard_path=args.shard_path,
+                     embedding_cache_path="cache/query_embeddings.pkl")
+    if not args.no_warmup:
+        # Load the model and both indexes once, before the first request
+        engine = get_engine()
+        for search in (engine.search_texts_batch, engine.search_questions_batch):
+            try:
+                search(["warm up"], 1)
+            except FileNotFoundError as e:
+                logging.warning(f"⚠ {str(e)}")
+
+    server = create_server(args.host, args.port, args.socket, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    address = f"unix://{args.socket}" if args.socket else f"http://{args.host}:{server.server_address[1]}"
+    print(f"✅ Retrieval server on {address} (set RETRIEVAL_SERVER_URL={address} for the app)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import json
+import logging
+import faiss
+import numpy as np
+import os
+import time
+import pandas as pd
+from modules.index_factory import (
+    IVF_POINTS_PER_LIST, apply_search_params, create_index, prepare_vectors, resolve_index_params, set_search_params
+)
+from modules.record_store import open_record_store
+from modules.encoders import get_encoder
+from modules.retrieval_engine import CSV_PATH, FAISS_INDEX_PATH, FAISS_QA_INDEX_PATH
+
+# Setup logging
+logging.basicConfig(filename="logs/tune_index.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+INDEXES = {
+    "chunks": (FAISS_INDEX_PATH, "faiss_index.bin", "texts"),
+    "questions": (FAISS_QA_INDEX_PATH, "qa_index.bin", "questions"),
+}
+
+# Storage options compared by --codecs, against the float32 L2 index the app has always used
+STORAGE_OPTIONS = [
+    {"metric": "l2", "codec": "float32"},
+    {"metric": "ip", "codec": "float32"},
+    {"metric": "ip", "codec": "float16"},
+    {"metric": "ip", "codec": "sq8"},
+]
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def load_base_vectors(index_dir, index_file, store_name):
+    """
+    Returns (ids, vectors) for everything in a stored index.
+
+    Flat indexes are reconstructed directly; other index types are re-encoded from the text store.
+    """
+    faiss_index = faiss.read_index(os.path.join(index_dir, index_file))
+    if isinstance(faiss_index, faiss.IndexIDMap2):
+        inner = faiss.downcast_index(faiss_index.index)
+        if isinstance(inner, faiss.IndexFlat):
+            return faiss.vector_to_array(faiss_index.id_map), inner.reconstruct_n(0, inner.ntotal)
+
+    store_path = os.path.join(index_dir, store_name)
+    with open_record_store(store_path, f"{store_path}.pkl") as stored:
+        ids = stored.ids()
+        texts = [stored.get(i) for i in ids]
+    return ids.astype(np.int64), get_encoder().encode(texts).astype(np.float32)
+
+
+def load_queries(num_queries, seed):
+    """
+    Samples questions from the question bank to use as realistic search queries.
+    """
+    questions = pd.read_csv(CSV_PATH)["Question"].dropna()
+    sample = questions.sample(n=min(num_queries, len(questions)), random_state=seed).tolist()
+    return get_encoder().encode(sample).astype(np.float32)
+
+
+def candidate_params(args, num_vectors):
+    candidates = [resolve_index_params({"type": "flat"})]
+    for nlist in args.nlist:
+        if nlist * IVF_POINTS_PER_LIST > num_vectors:
+            continue
+        candidates.extend(resolve_index_params({"type": "ivf", "nlist": nlist, "nprobe": nprobe})
+                          for nprobe in args.nprobe if nprobe <= nlist)
+    for m in args.M:
+        candidates.extend(resolve_index_params({"type": "hnsw", "M": m, "efSearch": ef})
+                          for ef in args.ef_search)
+    return candidates
+
+
+def index_bytes(faiss_index):
+    """
+    Returns the serialized size of an index, which is close to the memory it takes once loaded.
+    """
+    return int(faiss.serialize_index(faiss_index).size)
+
+
+def measure(faiss_index, queries, truth, k):
+    """
+    Returns recall@k against `truth` plus single-query p50/p99 latency in milliseconds.
+    """
+    latencies = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for row, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = faiss_index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found[row] = ids[0]
+
+    recall = np.mean([len(set(found[row]) & set(truth[row])) / k for row in range(len(queries))])
+    return {
+        "recall_at_k": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+    }
+
+
+def tune(args):
+    index_dir, index_file, store_name = INDEXES[args.index]
+    ids, vectors = load_base_vectors(index_dir, index_file, store_name)
+    queries = load_queries(args.queries, args.seed)
+
+    # Exact search is the ground truth
+    exact = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+    exact.add_with_ids(vectors, ids)
+    _, truth = exact.search(queries, args.k)
+
+    results = []
+    built = {}
+    for params in candidate_params(args, len(vectors)):
+        build_key = (params["type"], params.get("nlist"), params.get("M"))
+        if build_key not in built:
+            start = time.perf_counter()
+            faiss_index = create_index(vectors.shape[1], dict(params), training_vectors=vectors)
+            faiss_index.add_with_ids(prepare_vectors(vectors, params), ids)
+            built[build_key] = (faiss_index, time.perf_counter() - start)
+        faiss_index, build_seconds = built[build_key]
+        apply_search_params(faiss_index, params)
+
+        result = {"params": params, "build_s": round(build_seconds, 3),
+                  **measure(faiss_index, prepare_vectors(queries, params), truth, args.k)}
+        results.append(result)
+        print(f"{json.dumps(params):<60} recall@{args.k}={result['recall_at_k']:.4f} "
+              f"p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms build={result['build_s']:.2f}s")
+
+    logging.info(f"✅ Tuned {args.index} index ({len(vectors)} vectors, {len(queries)} queries): {results}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"index": args.index, "vectors": len(vectors), "k": args.k, "results": results}, f, indent=2)
+    return results
+
+
+def compare_codecs(args):
+    """
+    Reports the memory and recall@k of each storage option on a flat index, relative to float32 L2.
+    """
+    index_dir, index_file, store_name = INDEXES[args.index]
+    ids, vectors = load_base_vectors(index_dir, index_file, store_name)
+    queries = load_queries(args.queries, args.seed)
+
+    results = []
+    truth = None
+    for storage in STORAGE_OPTIONS:
+        params = resolve_index_params({"type": "flat", **storage})
+        faiss_index = create_index(vectors.shape[1], params, training_vectors=vectors)
+        faiss_index.add_with_ids(prepare_vectors(vectors, params), ids)
+        if truth is None:
+            # The first option is the current float32 L2 index, which the others are measured against
+            _, truth = faiss_index.search(prepare_vectors(queries, params), args.k)
+        result = {"params": params, "bytes": index_bytes(faiss_index), **measure(faiss_index, prepare_vectors(queries, params), truth, args.k)}
+        result["memory_ratio"] = round(results[0]["bytes"] / result["bytes"], 2) if results else 1.0
+        results.append(result)
+        print(f"{storage['metric']:<3} {storage['codec']:<8} {result['bytes'] / 2**20:8.2f} MiB "
+              f"({result['memory_ratio']:.2f}x smaller) recall@{args.k}={result['recall_at_k']:.4f} "
+              f"p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms")
+
+    logging.info(f"✅ Compared storage options for {args.index} index ({len(vectors)} vectors): {results}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"index": args.index, "vectors": len(vectors), "k": args.k, "results": results}, f, indent=2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure recall@k and latency of FAISS index options against exact search.")
+    parser.add_argument("--index", choices=sorted(INDEXES), default="chunks")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200, help="number of questions sampled from the question bank")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--nlist", type=_int_list, default=[64, 256, 1024])
+    parser.add_argument("--nprobe", type=_int_list, default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--M", type=_int_list, default=[16, 32])
+    parser.add_argument("--ef-search", type=_int_list, default=[16, 32, 64, 128, 256])
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--set", metavar="KEY=VALUE", nargs="+",
+                        help="persist search parameters (e.g. nprobe=32) on the stored index instead of tuning")
+    parser.add_argument("--codecs", action="store_true",
+                        help="compare memory and recall of float32/float16/sq8 storage instead of tuning index types")
+    args = parser.parse_args()
+
+    if args.set:
+        search_params = {key: int(value) for key, value in (item.split("=", 1) for item in args.set)}
+        print(set_search_params(INDEXES[args.index][0], **search_params))
+        return
+    if args.codecs:
+        compare_codecs(args)
+        return
+    tune(args)
+
+
+if __name__ == "__main__":
+    main()